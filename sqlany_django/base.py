@@ -4,7 +4,7 @@ SQL Anywhere database backend for Django.
 Requires sqlanydb
 """
 
-import re,ctypes,sys
+import re,ctypes,sys,time
 
 try:
     import sqlanydb as Database
@@ -30,23 +30,40 @@ else:
         # renamed in 1.7
         util = utils
 from django.db.backends.signals import connection_created
+from sqlany_django import cache
 from sqlany_django.client import DatabaseClient
+from sqlany_django.converters import apply_converters, converter_set, register_converters
 from sqlany_django.creation import DatabaseCreation
+from sqlany_django.explain import capture_plan
 from sqlany_django.introspection import DatabaseIntrospection
+from sqlany_django.lookups import register_lookups
 from sqlany_django.validation import DatabaseValidation
 if djangoVersion[:2] >= (1, 7):
     from sqlany_django.schema import DatabaseSchemaEditor
 if djangoVersion[:2] >= (1, 8):
     from sqlany_django.creation import global_data_types
+    from sqlany_django.expressions import register_expressions
 
 DatabaseError = Database.DatabaseError
 IntegrityError = Database.IntegrityError
 
-Database.register_converter(Database.DT_TIMESTAMP, util.typecast_timestamp)
-Database.register_converter(Database.DT_DATE, util.typecast_date)
-Database.register_converter(Database.DT_TIME, util.typecast_time)
-Database.register_converter(Database.DT_DECIMAL, util.typecast_decimal)
-Database.register_converter(Database.DT_BIT, lambda x: x if x is None else bool(x))
+class DeadlockError(Database.OperationalError):
+    """
+    The transaction was chosen as the victim of a deadlock and rolled back.
+    """
+    pass
+
+class LockTimeoutError(Database.OperationalError):
+    """
+    A row or table lock couldn't be acquired, because blocking is off or
+    blocking_timeout expired.
+    """
+    pass
+
+register_converters()
+register_lookups()
+if djangoVersion[:2] >= (1, 8):
+    register_expressions()
 
 def trace(x):
     # print( x )
@@ -72,9 +89,17 @@ class CursorWrapper(object):
     to the particular underlying representation returned by Connection.cursor().
     """
     codes_for_integrityerror = (1048,)
+    codes_for_deadlock = (-306, -307)
+    codes_for_lock_timeout = (-210,)
 
-    def __init__(self, cursor):
+    def __init__(self, cursor, db=None):
         self.cursor = cursor
+        self.db = db
+        self.query_cache = db.query_cache if db is not None else None
+        self._cached_description = None
+        self._cached_rows = None
+        # The statement being executed, before its placeholders are converted
+        self._statement = None
 
     def __del__(self):
         if self.cursor:
@@ -92,27 +117,29 @@ class CursorWrapper(object):
     def execute(self, query, args=()):
         if djangoVersion[:2] >= (1, 4) and settings.USE_TZ:
             args = _datetimes_in(args)
+        self._cached_rows = None
+        self._statement = query
+        self._restore_blocking()
         try:
             if args != None:
                 query = self.convert_query(query, len(args))
-            ret = self.cursor.execute(trace(query), trace(args))
-            return ret
+            if self.query_cache is not None:
+                return self._execute_cached(query, args)
+            return self._execute(query, args)
         except Database.OperationalError as e:
-            if e.message == 'Connection was terminated':
+            if getattr(e, 'errortext', getattr(e, 'message', None)) == 'Connection was terminated':
                 from django import db
                 try:
                     db.close_old_connections()
                 except AttributeError:
                     db.close_connection()
-            # Map some error codes to IntegrityError, since they seem to be
-            # misclassified and Django would prefer the more logical place.
-            if e.errorcode in self.codes_for_integrityerror:
-                raise Database.IntegrityError(e)
+            self._raise_classified(e)
             raise
 
     def executemany(self, query, args):
         if djangoVersion[:2] >= (1, 4) and settings.USE_TZ:
             args = tuple(_datetimes_in(arg) for arg in args)
+        self._restore_blocking()
         try:
             try:
                 len(args)
@@ -120,32 +147,140 @@ class CursorWrapper(object):
                 args = tuple(args)
             if len(args) > 0:
                 query = self.convert_query(query, len(args[0]))
+                if self.query_cache is not None:
+                    self._invalidate(query)
                 ret = self.cursor.executemany(trace(query), trace(args))
                 return trace(ret)
             else:
                 return None
         except Database.OperationalError as e:
-            # Map some error codes to IntegrityError, since they seem to be
-            # misclassified and Django would prefer the more logical place.
-            if e.errorcode in self.codes_for_integrityerror:
-                raise Database.IntegrityError(e)
+            self._raise_classified(e)
+            raise
+
+    def _raise_classified(self, e):
+        # Map some error codes to IntegrityError, since they seem to be
+        # misclassified and Django would prefer the more logical place.
+        if e.errorcode in self.codes_for_integrityerror:
+            raise Database.IntegrityError(e)
+        # Lock conflicts get their own classes so that they can be retried
+        # (see sqlany_django.transaction.retry_atomic)
+        if e.errorcode in self.codes_for_deadlock:
+            raise DeadlockError(e.errortext, e.errorcode)
+        if e.errorcode in self.codes_for_lock_timeout:
+            raise LockTimeoutError(e.errortext, e.errorcode)
+
+    def _execute(self, query, args):
+        if self.db is not None and self.db.plan_capture is not None:
+            start = time.time()
+            ret = self.cursor.execute(trace(query), trace(args))
+            capture_plan(self.db, self._statement, args, time.time() - start)
+        else:
+            ret = self.cursor.execute(trace(query), trace(args))
+        if self.db is not None and self.cursor.description:
+            if self.db.converters is not None:
+                apply_converters(self.cursor, self.db.converters)
+            size = self.db.fetch_size(self.cursor.description)
+            if size:
+                self.cursor.arraysize = size
+        return ret
+
+    def _execute_cached(self, query, args):
+        """
+        Executes a statement through the result cache: cacheable SELECTs are
+        answered from the cache when possible, and statements that modify
+        data or schema invalidate the cached results of the tables they touch.
+        """
+        key = self.query_cache.key(query, args)
+        if key is None:
+            self._invalidate(query)
+            return self._execute(query, args)
+        hit = self.query_cache.get(key)
+        if hit is not None:
+            self._cached_description, rows = hit
+            self._cached_rows = list(rows)
+            return None
+        ret = self._execute(query, args)
+        # Only results read outside of a transaction are known to be
+        # committed, so those are the only ones that are stored
+        if not self._in_transaction():
+            self._cached_description = self.cursor.description
+            self._cached_rows = self.cursor.fetchall()
+            self.query_cache.set(key, self._cached_description, tuple(self._cached_rows))
+        return ret
+
+    def _invalidate(self, query):
+        tables = cache.write_tables(query)
+        if tables:
+            self.query_cache.invalidate(tables)
+            if self._in_transaction():
+                # Invalidate again once the transaction ends, in case another
+                # connection cached the old rows in the meantime
+                self.db.query_cache_pending.update(tables)
+
+    def _in_transaction(self):
+        if djangoVersion[:2] >= (1, 6):
+            return not self.db.get_autocommit()
+        return self.db.is_managed()
+
+    def _fetch(self, size=None):
+        if self._cached_rows is not None:
+            if size is None:
+                rows, self._cached_rows = self._cached_rows, []
+            else:
+                size = size or self.cursor.arraysize
+                rows, self._cached_rows = self._cached_rows[:size], self._cached_rows[size:]
+            return rows
+        if size is None:
+            return self._driver_fetch(self.cursor.fetchall)
+        return self._driver_fetch(self.cursor.fetchmany, size or self.cursor.arraysize)
+
+    def _restore_blocking(self):
+        if self.db is not None and self.db.blocking_restore is not None:
+            self.db.restore_blocking()
+
+    def _driver_fetch(self, method, *args):
+        # Rows are locked as they are fetched, so lock conflicts can be
+        # raised here as well as by execute()
+        self._restore_blocking()
+        try:
+            return method(*args)
+        except Database.OperationalError as e:
+            self._raise_classified(e)
             raise
 
     def fetchone(self):
+        if self._cached_rows is not None:
+            row = (self._fetch(1) or [None])[0]
+        else:
+            row = self._driver_fetch(self.cursor.fetchone)
         if djangoVersion[:2] < (1, 4) or not settings.USE_TZ:
-            return trace(self.cursor.fetchone())
-        return self._datetimes_out(self.cursor.fetchone())
+            return trace(row)
+        return self._datetimes_out(row)
 
     def fetchmany(self, size=0):
         if djangoVersion[:2] < (1, 4) or not settings.USE_TZ:
-            return trace(self.cursor.fetchmany(size))
-        rows = self.cursor.fetchmany(size)
+            return trace(self._fetch(size))
+        rows = self._fetch(size)
         return list(self._datetimes_out(row) for row in rows)
 
     def fetchall(self):
         if djangoVersion[:2] < (1, 4) or not settings.USE_TZ:
-            return trace(self.cursor.fetchall())
-        return list(self._datetimes_out(row) for row in self.cursor.fetchall())
+            return trace(self._fetch())
+        return list(self._datetimes_out(row) for row in self._fetch())
+
+    def to_arrays(self, chunk_size=None):
+        """
+        Returns the rest of the result set as a dictionary of column name ->
+        NumPy array (see sqlany_django.columnar).
+        """
+        from sqlany_django.columnar import fetch_arrays
+        return fetch_arrays(self, chunk_size=chunk_size)
+
+    @property
+    def description(self):
+        if self._cached_rows is not None:
+            return self._cached_description
+        return self.cursor.description
 
     def _datetimes_out(self, row):
         def fix(item):
@@ -158,7 +293,7 @@ class CursorWrapper(object):
         if row is None:
             return row
 
-        return trace(tuple(fix(item) for item in zip(row, self.cursor.description)))
+        return trace(tuple(fix(item) for item in zip(row, self.description)))
 
     def __getattr__(self, attr):
         if attr in self.__dict__:
@@ -174,19 +309,85 @@ class DatabaseFeatures(BaseDatabaseFeatures):
     empty_fetchmany_value = []
     has_bulk_insert = True
     has_select_for_update = True
+    has_select_for_update_nowait = True
     has_zoneinfo_database = False
+    # Host variables per statement
+    max_query_params = 32767
+    # Window functions, see sqlany_django.expressions
+    supports_over_clause = True
     related_fields_match_type = True
     supports_regex_backreferencing = False
     supports_sequence_reset = False
-    update_can_self_select = False
+    # UPDATEs may filter on subqueries of the table being updated
+    update_can_self_select = True
     uses_custom_query_class = False
+    uses_savepoints = True
+    can_release_savepoints = True
 
 class DatabaseOperations(BaseDatabaseOperations):
     compiler_module = "sqlany_django.compiler"
+    # IN lists longer than this are passed as one string to sa_split_list()
+    large_in_list_size = 100
+
+    # Start and end points of window frames
+    PRECEDING = 'PRECEDING'
+    FOLLOWING = 'FOLLOWING'
+    UNBOUNDED_PRECEDING = 'UNBOUNDED ' + PRECEDING
+    UNBOUNDED_FOLLOWING = 'UNBOUNDED ' + FOLLOWING
+    CURRENT_ROW = 'CURRENT ROW'
 
     def bulk_insert_sql(self, fields, num_values):
         items_sql = "(%s)" % ", ".join(["%s"] * len(fields))
-        return "VALUES " + ", ".join([items_sql] * num_values)
+        values_sql = "VALUES " + ", ".join([items_sql] * num_values)
+        if self.connection.on_existing is not None:
+            # Rows whose primary key exists are skipped or updated
+            return "ON EXISTING %s %s" % (self.connection.on_existing, values_sql)
+        return values_sql
+
+    def window_frame_start(self, start):
+        if start is None:
+            return self.UNBOUNDED_PRECEDING
+        if start == 0:
+            return self.CURRENT_ROW
+        if start < 0:
+            return '%d %s' % (abs(start), self.PRECEDING)
+        raise ValueError("start argument must be a negative integer, zero, or None, but got '%s'." % start)
+
+    def window_frame_end(self, end):
+        if end is None:
+            return self.UNBOUNDED_FOLLOWING
+        if end == 0:
+            return self.CURRENT_ROW
+        if end > 0:
+            return '%d %s' % (end, self.FOLLOWING)
+        raise ValueError("end argument must be a positive integer, zero, or None, but got '%s'." % end)
+
+    def window_frame_rows_start_end(self, start=None, end=None):
+        """
+        Returns the SQL for the start and end points of a ROWS window frame.
+        """
+        return self.window_frame_start(start), self.window_frame_end(end)
+
+    def window_frame_range_start_end(self, start=None, end=None):
+        # RANGE offsets are in units of the (single) ORDER BY expression
+        return self.window_frame_start(start), self.window_frame_end(end)
+
+    def bulk_batch_size(self, fields, objs):
+        """
+        Keeps each bulk insert within the features.max_query_params limit.
+        """
+        if not fields:
+            return len(objs)
+        return max(min(len(objs), self.connection.features.max_query_params // len(fields)), 1)
+
+    def bulk_update_batch_size(self, fields, objs):
+        """
+        Returns the number of rows bulk_update() sends per statement within
+        the features.max_query_params limit: each row takes a parameter for
+        its primary key and one per field.
+        """
+        max_params = self.connection.features.max_query_params
+        return max(min(len(objs), max_params // (len(fields) + 1)), 1)
 
     def date_extract_sql(self, lookup_type, field_name):
         """
@@ -195,15 +396,67 @@ class DatabaseOperations(BaseDatabaseOperations):
         """
         if lookup_type == 'week_day':
             # Returns an integer, 1-7, Sunday=1
-            return "DATEFORMAT(%s, 'd')" % field_name
+            return "DOW(%s)" % field_name
         else:
             # YEAR(), MONTH(), DAY() functions
             return "%s(%s)" % (lookup_type.upper(), field_name)
 
     if djangoVersion[:2] >= (1, 8):
-        # SQL Anywhere does not support the INTERVAL syntax
-        pass
-        #def date_interval_sql(self, timedelta):
+        # SQL Anywhere does not support the INTERVAL syntax. Durations are
+        # numbers of microseconds (the DurationField column type is bigint)
+        # and are added to dates and times with DATEADD.
+        def date_interval_sql(self, timedelta):
+            """
+            Returns a timedelta as a number of microseconds
+            """
+            microseconds = (timedelta.days * 86400 + timedelta.seconds) * 1000000 + timedelta.microseconds
+            return '%d' % microseconds, []
+
+        def format_for_duration_arithmetic(self, sql):
+            return sql
+
+        def duration_add_sql(self, connector, datetime, duration, internal_type='DateTimeField'):
+            """
+            Returns (sql, params) adding (or, with connector '-', subtracting)
+            a duration in microseconds to a date, time or timestamp of the
+            given internal type, each given as (sql, params). DATEADD takes
+            an INTEGER amount, so whole seconds and the remaining
+            microseconds are added separately.
+            """
+            datetime_sql, datetime_params = datetime
+            duration_sql, duration_params = duration
+            if connector == '-':
+                duration_sql = '-(%s)' % duration_sql
+            sql = ('DATEADD(microsecond, MOD(%(d)s, 1000000), '
+                   'DATEADD(second, TRUNCNUM((%(d)s) / 1000000, 0), %(dt)s))' %
+                   {'d': duration_sql, 'dt': datetime_sql})
+            # DATEADD returns a timestamp
+            if internal_type == 'DateField':
+                sql = 'CAST(%s AS DATE)' % sql
+            elif internal_type == 'TimeField':
+                sql = 'CAST(%s AS TIME)' % sql
+            return sql, list(duration_params) * 2 + list(datetime_params)
+
+        def duration_between_sql(self, lhs, rhs):
+            """
+            Returns (sql, params) for the number of microseconds from the
+            timestamp rhs to the timestamp lhs, each given as (sql, params).
+            The days between the two dates are counted with DATEDIFF and the
+            times of day are compared part by part, so the result doesn't
+            depend on how DATEDIFF counts partial seconds.
+            """
+            lhs_sql, lhs_params = lhs
+            rhs_sql, rhs_params = rhs
+            seconds = 'DATEPART(hour, %(x)s) * 3600 + DATEPART(minute, %(x)s) * 60 + DATEPART(second, %(x)s)'
+            sql = ('((CAST(DATEDIFF(day, DATE(%(rhs)s), DATE(%(lhs)s)) AS BIGINT) * 86400 + '
+                   '%(lhs_seconds)s - (%(rhs_seconds)s)) * 1000000 + '
+                   'DATEPART(microsecond, %(lhs)s) - DATEPART(microsecond, %(rhs)s))' %
+                   {'lhs': lhs_sql, 'rhs': rhs_sql,
+                    'lhs_seconds': seconds % {'x': lhs_sql},
+                    'rhs_seconds': seconds % {'x': rhs_sql}})
+            lhs_params, rhs_params = list(lhs_params), list(rhs_params)
+            return sql, (rhs_params + lhs_params + lhs_params * 3 + rhs_params * 3 +
+                         lhs_params + rhs_params)
     else:
         def date_interval_sql(self, sql, connector, timedelta):
             """
@@ -217,17 +470,7 @@ class DatabaseOperations(BaseDatabaseOperations):
         truncates the given date field field_name to a DATE object with only
         the given specificity.
         """
-        fields = ['year', 'month', 'day', 'hour', 'minute', 'second']
-        format = ('YYYY-', 'MM', '-DD', 'HH:', 'NN', ':SS') # Use double percents to escape.
-        format_def = ('0000-', '01', '-01', ' 00:', '00', ':00')
-        try:
-            i = fields.index(lookup_type) + 1
-        except ValueError:
-            sql = field_name
-        else:
-            format_str = ''.join([f for f in format[:i]] + [f for f in format_def[i:]])
-            sql = "CAST(DATEFORMAT(%s, '%s') AS DATETIME)" % (field_name, format_str)
-        return sql
+        return self._trunc_sql(lookup_type, field_name)
 
     def datetime_extract_sql(self, lookup_type, field_name, tzname):
         """
@@ -237,7 +480,7 @@ class DatabaseOperations(BaseDatabaseOperations):
         """
         if lookup_type == 'week_day':
             # Returns an integer, 1-7, Sunday=1
-            sql = "DATEFORMAT(%s, 'd')" % field_name
+            sql = "DOW(%s)" % field_name
         else:
             # YEAR(), MONTH(), DAY(), HOUR(), MINUTE(), SECOND() functions
             sql = "%s(%s)" % (lookup_type.upper(), field_name)
@@ -250,17 +493,41 @@ class DatabaseOperations(BaseDatabaseOperations):
         field_name to a datetime object with only the given specificity, and
         a tuple of parameters.
         """
-        fields = ['year', 'month', 'day', 'hour', 'minute', 'second']
-        format = ('YYYY-', 'MM', '-DD', 'HH:', 'NN', ':SS') # Use double percents to escape.
-        format_def = ('0000-', '01', '-01', ' 00:', '00', ':00')
-        try:
-            i = fields.index(lookup_type) + 1
-        except ValueError:
-            sql = field_name
+        return self._trunc_sql(lookup_type, field_name),[]
+
+    def _trunc_sql(self, lookup_type, field_name):
+        """
+        Truncates field_name with SQL Anywhere's date functions rather than
+        formatting it to a string and back.
+        """
+        f = field_name
+        if lookup_type == 'year':
+            sql = "YMD(YEAR(%s), 1, 1)" % f
+        elif lookup_type == 'quarter':
+            sql = "YMD(YEAR(%s), (QUARTER(%s) - 1) * 3 + 1, 1)" % (f, f)
+        elif lookup_type == 'month':
+            sql = "YMD(YEAR(%s), MONTH(%s), 1)" % (f, f)
+        elif lookup_type == 'week':
+            # DOW() is 1-7 starting on Sunday; weeks start on Monday
+            sql = "DATEADD(day, -MOD(DOW(%s) + 5, 7), DATE(%s))" % (f, f)
+        elif lookup_type == 'day':
+            sql = "DATE(%s)" % f
+        elif lookup_type == 'hour':
+            sql = "DATEADD(hour, HOUR(%s), DATE(%s))" % (f, f)
+        elif lookup_type == 'minute':
+            sql = "DATEADD(minute, HOUR(%s) * 60 + MINUTE(%s), DATE(%s))" % (f, f, f)
+        elif lookup_type == 'second':
+            sql = "DATEADD(second, HOUR(%s) * 3600 + MINUTE(%s) * 60 + SECOND(%s), DATE(%s))" % (f, f, f, f)
         else:
-            format_str = ''.join([f for f in format[:i]] + [f for f in format_def[i:]])
-            sql = "CAST(DATEFORMAT(%s, '%s') AS DATETIME)" % (field_name, format_str)
-        return sql,[]
+            return field_name
+        return "CAST(%s AS DATETIME)" % sql
+
+    def datetime_cast_date_sql(self, field_name, tzname):
+        """
+        Returns the SQL that casts a datetime field field_name to a date, and
+        a tuple of parameters.
+        """
+        return "DATE(%s)" % field_name, []
 
     def deferrable_sql(self):
         return ""
@@ -280,6 +547,14 @@ class DatabaseOperations(BaseDatabaseOperations):
         """
         return ["NULL"]
 
+    def for_update_sql(self, nowait=False):
+        """
+        Returns the FOR UPDATE SQL clause to lock rows for an update
+        operation. SQL Anywhere has no NOWAIT or SKIP LOCKED clauses; the
+        compiler turns off blocking or adds READPAST hints instead.
+        """
+        return 'FOR UPDATE'
+
     def fulltext_search_sql(self, field_name):
         """
         Returns the SQL WHERE clause to use in order to perform a full-text
@@ -356,7 +631,7 @@ class DatabaseOperations(BaseDatabaseOperations):
         """
         Returns the SQL for committing the given savepoint.
         """
-        return 'COMMIT'
+        return 'RELEASE SAVEPOINT ' + self.quote_name(sid)
 
     def savepoint_rollback_sql(self, sid):
         """
@@ -441,11 +716,56 @@ class DatabaseWrapper(BaseDatabaseWrapper):
         data_types = global_data_types
 
     Database = Database
+
+    # Keys in OPTIONS that configure the backend itself rather than being
+    # passed on to sqlanydb.connect()
+    backend_options = ('RESULT_CACHE', 'FETCH_SIZE', 'FETCH_TARGET_BYTES', 'CONVERTERS',
+                       'ISOLATION_LEVEL', 'DB_CASCADE', 'PLAN_CAPTURE')
+
+    # Values of the isolation_level option by name. Snapshot levels require
+    # the allow_snapshot_isolation database option.
+    isolation_levels = {
+        'read uncommitted': '0',
+        'read committed': '1',
+        'repeatable read': '2',
+        'serializable': '3',
+        'snapshot': 'snapshot',
+        'statement snapshot': 'statement-snapshot',
+        'readonly statement snapshot': 'readonly-statement-snapshot',
+    }
+
+    # Column widths used when sizing fetches. Long and unbounded columns are
+    # counted as long_column_width bytes; the driver fetches them separately.
+    default_column_width = 8
+    long_column_width = 1024
+    max_fetch_size = 10000
+    # SQL Anywhere does not prefetch more than 1000 rows per request
+    max_prefetch_rows = 1000
+    prefetch_param_names = {'PrefetchBuffer': ('prefetchbuffer', 'pbuf'),
+                            'PrefetchRows': ('prefetchrows', 'prows')}
     
     def __init__(self, *args, **kwargs):
         super(DatabaseWrapper, self).__init__(*args, **kwargs)
 
         self.server_version = None
+        self.isolation_level = None
+        self.isolation_level_stack = []
+        # The blocking option as last set on the connection (None until
+        # known), and the value select_for_update(nowait=True) left to be
+        # restored before the next statement; see set_blocking()
+        self.blocking = None
+        self.blocking_restore = None
+        # ON EXISTING action ('SKIP' or 'UPDATE') added to bulk inserts while
+        # set, see sqlany_django.bulk.bulk_create()
+        self.on_existing = None
+        # Slow statement plan logging, see sqlany_django.explain.capture_plan()
+        self.plan_capture = self.backend_option('PLAN_CAPTURE')
+        self.query_cache = cache.get_query_cache(self.alias, self.backend_option('RESULT_CACHE'))
+        self.query_cache_pending = set()
+        # The driver's converters are the 'native' set; other sets are
+        # applied to each result set of this connection
+        converters = self.backend_option('CONVERTERS')
+        self.converters = converter_set(converters) if converters not in (None, 'native') else None
         if djangoVersion[:2] >= (1, 3):
             self.features = DatabaseFeatures(self)
         else:
@@ -472,17 +792,81 @@ class DatabaseWrapper(BaseDatabaseWrapper):
                 self.connection = None
         return False
 
+    def _options(self):
+        if 'OPTIONS' in self.settings_dict:
+            return self.settings_dict['OPTIONS'] or {}
+        return self.settings_dict.get('DATABASE_OPTIONS') or {}
+
+    def backend_option(self, key, default=None):
+        """
+        Returns the value of one of the backend_options from OPTIONS.
+        """
+        return self._options().get(key, default)
+
+    def connection_options(self):
+        """
+        Returns the OPTIONS that are passed on to sqlanydb.connect().
+        """
+        return dict((k, v) for k, v in self._options().items()
+                    if k not in self.backend_options)
+
+    def fetch_size(self, description):
+        """
+        Returns the number of rows to fetch at a time for a result set with
+        the given cursor.description, aiming at FETCH_TARGET_BYTES per fetch.
+        FETCH_SIZE sets a fixed number of rows instead. Returns None if
+        neither is set.
+        """
+        size = self.backend_option('FETCH_SIZE')
+        if size:
+            return size
+        target = self.backend_option('FETCH_TARGET_BYTES')
+        if not target:
+            return None
+        width = 0
+        for column in description:
+            column_width = column[3] or self.default_column_width
+            width += min(column_width, self.long_column_width)
+        return max(1, min(target // max(width, 1), self.max_fetch_size))
+
+    def prefetch_params(self):
+        """
+        Returns the connection parameters controlling the driver's row
+        prefetch. With FETCH_TARGET_BYTES set, the prefetch buffer is sized to
+        the target and the row limit is lifted, so that narrow rows come back
+        many to a round trip and wide rows fewer.
+        """
+        target = self.backend_option('FETCH_TARGET_BYTES')
+        if not target:
+            return {}
+        # PrefetchBuffer is given in kilobytes
+        return {'PrefetchBuffer': str(max(1, target // 1024)),
+                'PrefetchRows': str(self.max_prefetch_rows)}
+
     def check_constraints(self, table_names=None):
         self.cursor().execute('PREPARE TO COMMIT')
 
     def _cursor(self):
         return self.create_cursor()
 
+    def _commit(self):
+        try:
+            return BaseDatabaseWrapper._commit(self)
+        finally:
+            self._flush_query_cache_pending()
+
     def _rollback(self):
         try:
             BaseDatabaseWrapper._rollback(self)
         except Database.NotSupportedError:
             pass
+        finally:
+            self._flush_query_cache_pending()
+
+    def _flush_query_cache_pending(self):
+        if self.query_cache_pending:
+            self.query_cache.invalidate(self.query_cache_pending)
+            self.query_cache_pending = set()
 
     # New methods for Django 1.6
     def get_connection_params(self):
@@ -547,7 +931,13 @@ class DatabaseWrapper(BaseDatabaseWrapper):
                 links['port'] = str( port )
         if len(links) > 0:
             kwargs['links'] = 'tcpip(' + ','.join(k+'='+v for k, v in list(links.items())) + ')'
-        kwargs.update(setting( 'OPTIONS' ))
+        options = self.connection_options()
+        given = set(k.lower() for k in options)
+        for key, value in self.prefetch_params().items():
+            # Prefetch parameters given explicitly in OPTIONS win
+            if not given & set(self.prefetch_param_names[key]):
+                kwargs[key] = value
+        kwargs.update(options)
         return kwargs
 
     def get_new_connection( self, conn_params ):
@@ -557,8 +947,88 @@ class DatabaseWrapper(BaseDatabaseWrapper):
             curs = conn.cursor()
             curs.execute( "SET TEMPORARY OPTION chained='Off'" )
             curs.close()
+        self.isolation_level = None
+        self.blocking = None
+        self.blocking_restore = None
+        level = self.backend_option('ISOLATION_LEVEL')
+        if conn is not None and level is not None:
+            level = self.isolation_level_value(level)
+            curs = conn.cursor()
+            curs.execute( self.isolation_level_sql(level) )
+            curs.close()
+            self.isolation_level = level
         return conn
+
+    def isolation_level_value(self, level):
+        """
+        Returns the value of the isolation_level option for an isolation
+        level given by name (eg. 'snapshot', 'read committed') or number.
+        """
+        key = str(level).lower().replace('-', ' ').replace('_', ' ')
+        if key in self.isolation_levels:
+            return self.isolation_levels[key]
+        if key in self.isolation_levels.values():
+            return key
+        if key.replace(' ', '-') in self.isolation_levels.values():
+            return key.replace(' ', '-')
+        from django.core.exceptions import ImproperlyConfigured
+        raise ImproperlyConfigured("Invalid SQL Anywhere isolation level %r" % (level,))
+
+    def isolation_level_sql(self, level):
+        return "SET TEMPORARY OPTION isolation_level='%s'" % level
+
+    def get_isolation_level( self ):
+        """
+        Returns the isolation level of this connection, as a value of the
+        isolation_level option, reading it the first time.
+        """
+        if self.isolation_level is None:
+            curs = self.create_cursor()
+            curs.execute( "SELECT CONNECTION_PROPERTY('isolation_level')" )
+            self.isolation_level = str(curs.fetchone()[0]).lower()
+            curs.close()
+        return self.isolation_level
+
+    def set_isolation_level( self, level ):
+        """
+        Sets the isolation level for the following transactions on this
+        connection. Returns the level that was in effect before.
+        """
+        level = self.isolation_level_value(level)
+        previous = self.get_isolation_level()
+        if level != previous:
+            curs = self.create_cursor()
+            curs.execute( self.isolation_level_sql(level) )
+            curs.close()
+        self.isolation_level = level
+        return previous
         
+    def set_blocking( self, blocking ):
+        """
+        Turns the blocking option of this connection on or off, unless it
+        already is. Returns the previous setting.
+        """
+        previous = self.blocking
+        if previous is None:
+            curs = self.create_cursor()
+            curs.execute( "SELECT CONNECTION_PROPERTY('blocking')" )
+            previous = curs.fetchone()[0] == 'On'
+            curs.close()
+        if blocking != previous:
+            curs = self.create_cursor()
+            curs.execute( "SET TEMPORARY OPTION blocking='%s'" % ('On' if blocking else 'Off') )
+            curs.close()
+        self.blocking = blocking
+        return previous
+
+    def restore_blocking( self ):
+        """
+        Restores the blocking option left off by select_for_update(nowait=True).
+        """
+        blocking, self.blocking_restore = self.blocking_restore, None
+        if blocking is not None:
+            self.set_blocking(blocking)
+
     def init_connection_state( self ):
         if 'AUTOCOMMIT' in self.settings_dict and \
            not self.settings_dict['AUTOCOMMIT']:
@@ -569,13 +1039,13 @@ class DatabaseWrapper(BaseDatabaseWrapper):
         if not self._valid_connection():
             kwargs = self.get_connection_params()
             self.connection = self.get_new_connection(kwargs)
-            cursor = CursorWrapper(self.connection.cursor())
+            cursor = CursorWrapper(self.connection.cursor(), self)
             if djangoVersion[:2] < (1, 2):
                 cursor.execute("SET TEMPORARY OPTION PUBLIC.reserved_keywords='LIMIT'")
             cursor.execute("SET TEMPORARY OPTION TIMESTAMP_FORMAT='YYYY-MM-DD HH:NN:SS.SSSSSS'")
             connection_created.send(sender=self.__class__, connection=self)
         if not cursor:
-            cursor = CursorWrapper(self.connection.cursor())
+            cursor = CursorWrapper(self.connection.cursor(), self)
 
         return cursor
 
@@ -0,0 +1,138 @@
+"""
+Bulk operations for SQL Anywhere.
+
+bulk_update() saves the given fields of many model instances with one MERGE
+statement per batch of rows, instead of one UPDATE per instance::
+
+    from sqlany_django.bulk import bulk_update
+
+    for sale in sales:
+        sale.amount *= 2
+    bulk_update(sales, ['amount'])
+"""
+
+import re
+
+from django.db import connections, router, transaction
+
+# Column constraints that db_type() may include but CAST doesn't take
+_column_constraints = re.compile(r'\s+(?:DEFAULT\s+AUTOINCREMENT|NOT\s+NULL|NULL)\b', re.I)
+
+def _cast_type(field, connection):
+    # The bare data type, without the DEFAULT AUTOINCREMENT of an AutoField
+    # or the NULL of a NullBooleanField
+    return _column_constraints.sub('', field.db_type(connection))
+
+def _fields_by_table(fields):
+    """
+    Groups fields by the concrete model whose table holds their column, a
+    parent model's for fields inherited through multi-table inheritance.
+    """
+    tables = []
+    for field in fields:
+        model = field.model._meta.concrete_model
+        for table_model, table_fields in tables:
+            if table_model is model:
+                table_fields.append(field)
+                break
+        else:
+            tables.append((model, [field]))
+    return tables
+
+def merge_sql(model, fields, num_rows, connection):
+    """
+    Returns a MERGE statement updating the columns of fields, which must be
+    in the table of model, from num_rows rows of parameters, each row being
+    the primary key followed by the field values.
+    """
+    qn = connection.ops.quote_name
+    opts = model._meta
+    columns = [opts.pk] + list(fields)
+    row_sql = 'SELECT %s FROM dummy' % ', '.join(
+        'CAST(%%s AS %s) AS %s' % (_cast_type(f, connection), qn(f.column)) for f in columns)
+    return ('MERGE INTO %(table)s USING (%(rows)s) AS "sa_rows" '
+            'ON %(table)s.%(pk)s = "sa_rows".%(pk)s '
+            'WHEN MATCHED THEN UPDATE SET %(set)s' %
+            {'table': qn(opts.db_table),
+             'rows': ' UNION ALL '.join([row_sql] * num_rows),
+             'pk': qn(opts.pk.column),
+             'set': ', '.join('%s = "sa_rows".%s' % (qn(f.column), qn(f.column))
+                              for f in fields)})
+
+def bulk_update(objs, fields, batch_size=None, using=None):
+    """
+    Saves the named fields of objs, which must all be saved instances of the
+    same model, and returns the number of instances updated. Fields of
+    parent models are saved with one MERGE per table.
+    """
+    objs = list(objs)
+    if not objs:
+        return 0
+    if not fields:
+        raise ValueError("Field names must be given to bulk_update().")
+    model = objs[0].__class__
+    opts = model._meta
+    fields = [opts.get_field(name) for name in fields]
+    for field in fields:
+        if (field.primary_key or not getattr(field, 'concrete', True) or
+                getattr(field, 'many_to_many', False)):
+            raise ValueError("bulk_update() can only be used with concrete fields "
+                             "other than the primary key.")
+    if any(obj.pk is None for obj in objs):
+        raise ValueError("All bulk_update() objects must have a primary key set.")
+    if using is None:
+        using = router.db_for_write(model, instance=objs[0])
+    connection = connections[using]
+    updated = 0
+    with transaction.atomic(using=using, savepoint=False):
+        cursor = connection.cursor()
+        try:
+            for table_model, table_fields in _fields_by_table(fields):
+                # The child's row shares the primary key value of its parents'
+                pk = table_model._meta.pk
+                size = min(batch_size or len(objs),
+                           connection.ops.bulk_update_batch_size(table_fields, objs))
+                table_updated = 0
+                for start in range(0, len(objs), size):
+                    batch = objs[start:start + size]
+                    params = []
+                    for obj in batch:
+                        params.append(pk.get_db_prep_value(getattr(obj, pk.attname), connection))
+                        for field in table_fields:
+                            value = getattr(obj, field.attname)
+                            if hasattr(value, 'resolve_expression'):
+                                raise ValueError("bulk_update() can only save plain values.")
+                            params.append(field.get_db_prep_save(value, connection))
+                    cursor.execute(merge_sql(table_model, table_fields, len(batch), connection),
+                                   params)
+                    table_updated += cursor.rowcount
+                updated = max(updated, table_updated)
+        finally:
+            cursor.close()
+    return updated
+
+def bulk_create(objs, batch_size=None, ignore_conflicts=False, update_conflicts=False,
+                using=None):
+    """
+    Like QuerySet.bulk_create(), but rows whose primary key already exists
+    are skipped (ignore_conflicts) or overwritten with the new values
+    (update_conflicts) by INSERT ... ON EXISTING, instead of failing.
+    """
+    objs = list(objs)
+    if not objs:
+        return objs
+    if ignore_conflicts and update_conflicts:
+        raise ValueError("ignore_conflicts and update_conflicts are mutually exclusive.")
+    model = objs[0].__class__
+    if using is None:
+        using = router.db_for_write(model, instance=objs[0])
+    connection = connections[using]
+    previous = connection.on_existing
+    if ignore_conflicts:
+        connection.on_existing = 'SKIP'
+    elif update_conflicts:
+        connection.on_existing = 'UPDATE'
+    try:
+        return model._default_manager.using(using).bulk_create(objs, batch_size=batch_size)
+    finally:
+        connection.on_existing = previous
@@ -0,0 +1,176 @@
+"""
+Optional result cache for read queries.
+
+Results of SELECT statements that only reference tables on an allow-list are
+kept either in process or in one of Django's configured caches. Any INSERT,
+UPDATE, DELETE or DDL statement executed through the backend invalidates the
+entries for the tables it touches.
+"""
+
+import re, time, hashlib, threading
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from django.utils.datastructures import SortedDict as OrderedDict
+
+_name = r'(?:"[^"]+"|\w+)'
+_qualified_name = r'%s(?:\.%s)?' % (_name, _name)
+
+# Tables read by a query
+read_tables_re = re.compile(r'\b(?:FROM|JOIN)\s+(%s)' % _qualified_name, re.I)
+# "FROM a, b" style joins - we don't try to parse those, just refuse to cache
+comma_join_re = re.compile(r'\bFROM\s+%s(?:\s+(?:AS\s+)?\w+)?\s*,' % _qualified_name, re.I)
+# Tables written by a statement
+write_tables_re = re.compile(r'\b(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM|DELETE|MERGE\s+INTO|'
+                             r'TRUNCATE\s+TABLE|(?:CREATE|ALTER|DROP)\s+TABLE|LOAD\s+(?:INTO\s+)?TABLE|'
+                             r'(?:CREATE|DROP)\s+(?:UNIQUE\s+)?INDEX\s+%s\s+ON|'
+                             r'(?:CREATE|DROP)\s+TEXT\s+INDEX\s+%s\s+ON|'
+                             r'REFRESH\s+TEXT\s+INDEX\s+%s\s+ON)\s+(%s)'
+                             % (_name, _name, _name, _qualified_name), re.I)
+# Queries that lock the rows they read (select_for_update(), table hints)
+locking_re = re.compile(r'\bFOR\s+UPDATE\b|\bWITH\s*\([^)]*\b(?:READPAST|UPDLOCK|XLOCK|HOLDLOCK|NOWAIT)\b',
+                        re.I)
+select_re = re.compile(r'^\s*SELECT\b', re.I)
+write_re = re.compile(r'^\s*(?:INSERT|UPDATE|DELETE|MERGE|TRUNCATE|CREATE|ALTER|DROP|LOAD|REFRESH)\b', re.I)
+
+def _table_name(name):
+    # Strip the owner and quoting, table names are compared case-insensitively
+    name = name.split('.')[-1]
+    return name.strip('"').lower()
+
+def read_tables(query):
+    """
+    Returns the set of tables referenced by a SELECT statement, or None if
+    the statement is not a SELECT, locks rows, or the tables can't be
+    determined.
+    """
+    if (not select_re.match(query) or comma_join_re.search(query) or
+            locking_re.search(query)):
+        return None
+    tables = set(_table_name(t) for t in read_tables_re.findall(query))
+    return tables or None
+
+def write_tables(query):
+    """
+    Returns the set of tables modified by a statement, or None if the
+    statement does not modify data or schema.
+    """
+    if not write_re.match(query):
+        return None
+    return set(_table_name(t) for t in write_tables_re.findall(query))
+
+class QueryCache(object):
+    """
+    Caches (description, rows) pairs for SELECT statements.
+
+    Every allow-listed table has a generation counter that is part of the key
+    of every entry reading from it, so invalidating a table just bumps its
+    counter. Stale entries then age out through the TIMEOUT and MAX_ENTRIES
+    limits.
+    """
+    def __init__(self, tables, max_entries=1000, timeout=300, cache_alias=None):
+        self.tables = set(_table_name(t) for t in tables)
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.cache_alias = cache_alias
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generations = {}
+
+    def _cache(self):
+        if self.cache_alias is None:
+            return None
+        try:
+            from django.core.cache import caches
+            return caches[self.cache_alias]
+        except ImportError:
+            from django.core.cache import get_cache
+            return get_cache(self.cache_alias)
+
+    def _generation_key(self, table):
+        return 'sqlany_django:gen:%s' % table
+
+    def _generation(self, table):
+        cache = self._cache()
+        if cache is None:
+            return self._generations.get(table, 0)
+        return cache.get(self._generation_key(table), 0)
+
+    def key(self, query, args):
+        """
+        Returns the cache key for the given statement, or None if the
+        statement may not be cached.
+        """
+        tables = read_tables(query)
+        if tables is None or not tables <= self.tables:
+            return None
+        generations = tuple((t, self._generation(t)) for t in sorted(tables))
+        digest = hashlib.sha1(repr((query, tuple(args or ()), generations)).encode('utf-8'))
+        return 'sqlany_django:rows:%s' % digest.hexdigest()
+
+    def get(self, key):
+        cache = self._cache()
+        if cache is not None:
+            return cache.get(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires is not None and expires < time.time():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, description, rows):
+        value = (description, rows)
+        cache = self._cache()
+        if cache is not None:
+            cache.set(key, value, self.timeout)
+            return
+        expires = time.time() + self.timeout if self.timeout else None
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (expires, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tables):
+        """
+        Invalidates all cached results reading from any of the given tables.
+        """
+        tables = set(tables) & self.tables
+        if not tables:
+            return
+        cache = self._cache()
+        for table in tables:
+            if cache is None:
+                with self._lock:
+                    self._generations[table] = self._generations.get(table, 0) + 1
+            else:
+                key = self._generation_key(table)
+                cache.add(key, 0, None)
+                try:
+                    cache.incr(key)
+                except ValueError:
+                    cache.set(key, 1, None)
+
+# One cache per database alias, shared by the connections of all threads
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_query_cache(alias, config):
+    """
+    Returns the QueryCache for the given database alias, creating it from the
+    RESULT_CACHE dictionary in the database OPTIONS if necessary.
+    """
+    if not config or not config.get('TABLES'):
+        return None
+    with _caches_lock:
+        if alias not in _caches:
+            _caches[alias] = QueryCache(config['TABLES'],
+                                        max_entries=config.get('MAX_ENTRIES', 1000),
+                                        timeout=config.get('TIMEOUT', 300),
+                                        cache_alias=config.get('CACHE'))
+        return _caches[alias]
@@ -0,0 +1,181 @@
+"""
+Columnar fetches into NumPy arrays.
+
+Results are read in fetchmany() chunks and copied column by column into
+preallocated arrays whose dtypes follow the native SQL Anywhere column types,
+so no list of row tuples is ever built up. Columns that allow NULLs are
+returned as numpy.ma masked arrays with NULLs masked.
+
+From a cursor::
+
+    cursor.execute("SELECT id, amount FROM sales")
+    arrays = cursor.to_arrays()
+
+From a queryset, with ColumnarQuerySet as the model's manager::
+
+    objects = ColumnarQuerySet.as_manager()
+
+    arrays = Sale.objects.filter(year=2015).values_list('id', 'amount').to_arrays()
+
+Requires numpy.
+"""
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from django.utils.datastructures import SortedDict as OrderedDict
+
+from django.db.models.query import QuerySet
+from sqlany_django.base import Database
+from sqlany_django.introspection import DatabaseIntrospection
+
+DEFAULT_CHUNK_SIZE = 10000
+
+# dtypes for the field types in DatabaseIntrospection.data_types_reverse
+field_dtypes = {
+    'IntegerField': 'int64',
+    'BigIntegerField': 'int64',
+    'FloatField': 'float64',
+    'DateTimeField': 'datetime64[us]',
+    'DateField': 'datetime64[D]',
+}
+
+# Native types that need a different dtype than their field type suggests
+native_dtypes = {
+    Database.DT_BIT: 'bool',
+    Database.DT_UNSBIGINT: 'uint64',
+    # TIME values map to DateTimeField, but come back as datetime.time
+    Database.DT_TIME: 'object',
+}
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError as e:
+        from django.core.exceptions import ImproperlyConfigured
+        raise ImproperlyConfigured("Error loading numpy module: %s" % e)
+    return numpy
+
+def column_dtype(native_type, description):
+    """
+    Returns the NumPy dtype for a column of the given native (DT_*) type and
+    cursor.description entry.
+    """
+    if native_type in native_dtypes:
+        return native_dtypes[native_type]
+    if native_type == Database.DT_DECIMAL:
+        # Fractional decimals lose precision as float64
+        return 'int64' if not description[5] else 'float64'
+    field = DatabaseIntrospection.data_types_reverse.get(native_type)
+    return field_dtypes.get(field, 'object')
+
+def _fill_value(numpy, dtype):
+    if dtype.kind == 'M':
+        return numpy.datetime64('NaT')
+    if dtype.kind == 'O':
+        return None
+    return dtype.type(0)
+
+def _rows_and_types(cursor):
+    """
+    Returns the cursor to fetch rows from, its fetchmany() and the native
+    type of each column. Rows are read from the driver's cursor where
+    possible, skipping the per-row work of the backend's CursorWrapper.
+    """
+    from sqlany_django.base import CursorWrapper
+    while not isinstance(cursor, CursorWrapper) and hasattr(cursor, 'cursor'):
+        # Django's own cursor wrappers
+        cursor = cursor.cursor
+    if isinstance(cursor, CursorWrapper):
+        if cursor._cached_rows is not None:
+            # Served from the result cache; there is no driver result set
+            return cursor, cursor.fetchmany, [None] * len(cursor.description)
+        wrapper, cursor = cursor, cursor.cursor
+        # Still raise lock conflicts as DeadlockError and LockTimeoutError
+        fetchmany = lambda size: wrapper._driver_fetch(cursor.fetchmany, size)
+    else:
+        fetchmany = cursor.fetchmany
+    return cursor, fetchmany, [native_type for info, native_type in cursor.columns()]
+
+def fetch_arrays(cursor, names=None, chunk_size=None):
+    """
+    Reads the rest of the current result set of cursor into an OrderedDict
+    of column name -> array. names overrides the column names from
+    cursor.description.
+    """
+    numpy = _numpy()
+    chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+    rows, fetchmany, native_types = _rows_and_types(cursor)
+    description = rows.description
+    names = list(names or [d[0] for d in description])
+    dtypes = [numpy.dtype(column_dtype(t, d) if t is not None else 'object')
+              for t, d in zip(native_types, description)]
+    nullable = [bool(d[6]) for d in description]
+
+    capacity = rows.rowcount if getattr(rows, 'rowcount', -1) > 0 else chunk_size
+    data = [numpy.empty(capacity, dtype=dtype) for dtype in dtypes]
+    masks = [numpy.zeros(capacity, dtype=bool) if n else None for n in nullable]
+    fills = [_fill_value(numpy, dtype) for dtype in dtypes]
+    count = 0
+    while True:
+        chunk = fetchmany(chunk_size)
+        if not chunk:
+            break
+        end = count + len(chunk)
+        if end > capacity:
+            capacity = max(end, capacity * 2)
+            data = [numpy.resize(a, capacity) for a in data]
+            masks = [numpy.resize(m, capacity) if m is not None else None for m in masks]
+        for i, values in enumerate(zip(*chunk)):
+            if masks[i] is not None:
+                nulls = [v is None for v in values]
+                if any(nulls):
+                    masks[i][count:end] = nulls
+                    values = [fills[i] if v is None else v for v in values]
+                else:
+                    masks[i][count:end] = False
+            if dtypes[i].kind == 'M':
+                # Aware datetimes are in UTC
+                values = [v.replace(tzinfo=None) if getattr(v, 'tzinfo', None) else v
+                          for v in values]
+            data[i][count:end] = values
+        count = end
+
+    arrays = OrderedDict()
+    for name, values, mask in zip(names, data, masks):
+        values = values[:count]
+        if mask is not None:
+            values = numpy.ma.MaskedArray(values, mask=mask[:count])
+        arrays[name] = values
+    return arrays
+
+def _select_names(compiler):
+    names = []
+    for i, (expression, sql, alias) in enumerate(compiler.select):
+        target = getattr(expression, 'target', None)
+        names.append(alias or getattr(target, 'attname', None) or 'col%d' % (i + 1))
+    return names
+
+def queryset_to_arrays(queryset, chunk_size=None):
+    """
+    Runs a queryset and returns its columns as arrays (see fetch_arrays).
+    """
+    from django.db import connections
+    compiler = queryset.query.get_compiler(using=queryset.db)
+    sql, params = compiler.as_sql()
+    if not sql:
+        return OrderedDict()
+    names = _select_names(compiler) if hasattr(compiler, 'select') else None
+    cursor = connections[queryset.db].cursor()
+    try:
+        cursor.execute(sql, params)
+        return fetch_arrays(cursor, names, chunk_size)
+    finally:
+        cursor.close()
+
+class ColumnarQuerySet(QuerySet):
+    def to_arrays(self, chunk_size=None):
+        """
+        Returns the columns of the query as a dictionary of NumPy arrays.
+        """
+        return queryset_to_arrays(self, chunk_size)
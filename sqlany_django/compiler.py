@@ -1,12 +1,51 @@
 import re
 from django import VERSION as djangoVersion
 from django.db.models.sql import compiler
+from django.db.models.sql.constants import MULTI
 
 # Cache classes that have already been built
 _classes = {}
 select_re = re.compile('^SELECT[ ]+(DISTINCT\s)?')
 
 class SQLCompiler(compiler.SQLCompiler):
+    def get_from_clause(self):
+        """
+        select_for_update(skip_locked=True) of a
+        sqlany_django.transaction.LockingQuerySet is implemented with a
+        READPAST hint on the base table, so rows locked by other connections
+        are skipped rather than waited for.
+        """
+        result, params = super(SQLCompiler, self).get_from_clause()
+        if (self.query.select_for_update and result and
+                getattr(self.query, 'select_for_update_skip_locked', False)):
+            result[0] = '%s WITH (READPAST)' % result[0]
+        return result, params
+
+    def execute_sql(self, result_type=MULTI, *args, **kwargs):
+        """
+        select_for_update(nowait=True) is implemented by turning off the
+        blocking option while the statement runs, so a lock conflict raises
+        an error instead of waiting. Rows are locked as they are fetched, so
+        the results are read before blocking is restored.
+        """
+        if not (self.query.select_for_update and self.query.select_for_update_nowait):
+            return super(SQLCompiler, self).execute_sql(result_type, *args, **kwargs)
+        connection = self.connection
+        # Still off after a previous NOWAIT select if nothing ran since
+        restore, connection.blocking_restore = connection.blocking_restore, None
+        previous = connection.set_blocking(False)
+        if restore is not None:
+            previous = restore
+        try:
+            result = super(SQLCompiler, self).execute_sql(result_type, *args, **kwargs)
+            if result_type == MULTI and result is not None:
+                result = list(result)
+            return result
+        finally:
+            # Restored before the next statement or fetch, so that NOWAIT
+            # selects in a row don't each turn blocking off and on again
+            connection.blocking_restore = previous
+
     def as_sql(self, with_limits=True, with_col_aliases=True, subquery=True):
         if djangoVersion[:2] >= (1, 8):
             query, params = super(SQLCompiler, self).as_sql(with_limits=False, 
@@ -35,7 +74,20 @@ class SQLCompiler(compiler.SQLCompiler):
         return query, params
 
 class SQLInsertCompiler(compiler.SQLInsertCompiler, SQLCompiler):
-    pass
+    def as_sql(self, *args, **kwargs):
+        """
+        The ON EXISTING clause of connection.on_existing is only added by
+        bulk_insert_sql(), which Django doesn't use for inserts returning
+        an id or of fields with their own placeholders.
+        """
+        if self.connection.on_existing is not None:
+            fields = self.query.fields or ()
+            if getattr(self, 'return_id', False) or \
+                    any(hasattr(field, 'get_placeholder') for field in fields):
+                raise ValueError("ON EXISTING %s can only be used for bulk inserts of "
+                                 "fields without get_placeholder()." %
+                                 self.connection.on_existing)
+        return super(SQLInsertCompiler, self).as_sql(*args, **kwargs)
 
 class SQLDeleteCompiler(compiler.SQLDeleteCompiler, SQLCompiler):
     pass
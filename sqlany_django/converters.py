@@ -0,0 +1,158 @@
+"""
+Converters from SQL Anywhere result values to Python objects.
+
+Two sets are available: 'django' uses Django's generic typecast_* functions,
+'native' parses the fixed formats the backend asks the server for (see the
+TIMESTAMP_FORMAT set in DatabaseWrapper.create_cursor) and is several times
+faster. Values the native parsers don't recognise are handed on to the Django
+functions. Under USE_TZ, Django's typecast_timestamp (and so the 'django'
+set) returns aware datetimes in UTC, while the native parser returns naive
+ones that the backend's cursor makes aware; either way the cursor returns
+aware values.
+
+The 'native' set is registered with sqlanydb for every connection. A
+connection whose CONVERTERS option names another set gets that set applied
+to each of its result sets instead (see apply_converters()).
+
+Run this module to compare the two:
+
+    python -m sqlany_django.converters
+"""
+
+import datetime, sys, timeit
+
+try:
+    import sqlanydb as Database
+except ImportError as e:
+    from django.core.exceptions import ImproperlyConfigured
+    raise ImproperlyConfigured("Error loading sqlanydb module: %s" % e)
+
+from django import VERSION as djangoVersion
+if djangoVersion[:2] >= (1, 7):
+    # renamed in 1.7
+    from django.db.backends import utils as util
+else:
+    from django.db.backends import util
+
+_fromisoformat = getattr(datetime.datetime, 'fromisoformat', None)
+_date_fromisoformat = getattr(datetime.date, 'fromisoformat', None)
+_time_fromisoformat = getattr(datetime.time, 'fromisoformat', None)
+
+def _bit(x):
+    return x if x is None else bool(x)
+
+def convert_timestamp(s):
+    # YYYY-MM-DD HH:NN:SS.SSSSSS
+    if not s:
+        return None
+    if _fromisoformat is not None:
+        try:
+            return _fromisoformat(s)
+        except ValueError:
+            return util.typecast_timestamp(s)
+    if len(s) != 26 or s[10] != ' ':
+        return util.typecast_timestamp(s)
+    return datetime.datetime(int(s[0:4]), int(s[5:7]), int(s[8:10]),
+                             int(s[11:13]), int(s[14:16]), int(s[17:19]),
+                             int(s[20:26]))
+
+def convert_date(s):
+    # YYYY-MM-DD
+    if not s:
+        return None
+    if _date_fromisoformat is not None:
+        try:
+            return _date_fromisoformat(s)
+        except ValueError:
+            return util.typecast_date(s)
+    if len(s) != 10:
+        return util.typecast_date(s)
+    return datetime.date(int(s[0:4]), int(s[5:7]), int(s[8:10]))
+
+def convert_time(s):
+    # HH:NN:SS[.SSS...]
+    if not s:
+        return None
+    if _time_fromisoformat is not None:
+        try:
+            return _time_fromisoformat(s)
+        except ValueError:
+            pass
+    return util.typecast_time(s)
+
+def native_converters():
+    # Decimals are parsed by Decimal() in both sets
+    return {Database.DT_TIMESTAMP: convert_timestamp,
+            Database.DT_DATE: convert_date,
+            Database.DT_TIME: convert_time,
+            Database.DT_DECIMAL: util.typecast_decimal,
+            Database.DT_BIT: _bit}
+
+def django_converters():
+    return {Database.DT_TIMESTAMP: util.typecast_timestamp,
+            Database.DT_DATE: util.typecast_date,
+            Database.DT_TIME: util.typecast_time,
+            Database.DT_DECIMAL: util.typecast_decimal,
+            Database.DT_BIT: _bit}
+
+converter_sets = {'native': native_converters,
+                  'django': django_converters}
+
+def converter_set(name):
+    """
+    Returns the named set of converters, as a dictionary of sqlanydb type
+    code -> converter.
+    """
+    try:
+        return converter_sets[name]()
+    except KeyError:
+        from django.core.exceptions import ImproperlyConfigured
+        raise ImproperlyConfigured("Unknown CONVERTERS %r, expected one of %s" %
+                                   (name, ', '.join(sorted(converter_sets))))
+
+def register_converters(name='native'):
+    """
+    Registers the named set of converters with sqlanydb. Converters are
+    global to the driver, so this affects every connection.
+    """
+    for type_code, converter in converter_set(name).items():
+        Database.register_converter(type_code, converter)
+
+def apply_converters(cursor, converters):
+    """
+    Replaces the converters sqlanydb picked from its global registry for the
+    current result set of a driver cursor with those of the given set.
+    """
+    type_converter = getattr(cursor, 'converter', None)
+    if type_converter is None:
+        return
+    types = [native_type for info, native_type in cursor.columns()]
+    type_converter.converters = [converters.get(t, default) for t, default in
+                                 zip(types, type_converter.converters)]
+
+def benchmark(number=100000):
+    """
+    Times each converter of both sets on typical values and returns a list
+    of (type, django_seconds, native_seconds) tuples.
+    """
+    samples = [(Database.DT_TIMESTAMP, 'DT_TIMESTAMP', '2015-06-30 23:59:59.123456'),
+               (Database.DT_DATE, 'DT_DATE', '2015-06-30'),
+               (Database.DT_TIME, 'DT_TIME', '23:59:59.123')]
+    slow, fast = django_converters(), native_converters()
+    results = []
+    for type_code, type_name, value in samples:
+        if slow[type_code](value) != fast[type_code](value):
+            raise AssertionError("%s converters disagree on %r" % (type_name, value))
+        results.append((type_name,
+                        timeit.timeit(lambda: slow[type_code](value), number=number),
+                        timeit.timeit(lambda: fast[type_code](value), number=number)))
+    return results
+
+if __name__ == '__main__':
+    from django.conf import settings
+    if not settings.configured:
+        settings.configure()
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print("%-14s %10s %10s %8s" % ('type', 'django', 'native', 'speedup'))
+    for type_name, slow, fast in benchmark(number):
+        print("%-14s %9.3fs %9.3fs %7.1fx" % (type_name, slow, fast, slow / fast))
@@ -2,6 +2,7 @@ import sys, traceback, time, re
 from django.conf import settings
 
 from django import VERSION as djangoVersion
+from sqlany_django.search import text_indexes
 
 if djangoVersion[:2] >= (1, 8):
     from django.db.backends.base.creation import BaseDatabaseCreation, TEST_DATABASE_PREFIX
@@ -17,6 +18,7 @@ except ImportError as e:
 
 global_data_types = {
     'AutoField':         'integer DEFAULT AUTOINCREMENT',
+    'BinaryField':       'long binary',
     'BooleanField':      'bit',
     'NullBooleanField':  'bit null',
     'CharField':         'varchar(%(max_length)s)',
@@ -24,6 +26,7 @@ global_data_types = {
     'DateField':         'date',
     'DateTimeField':     'datetime',
     'DecimalField':      'numeric(%(max_digits)s, %(decimal_places)s)',
+    'DurationField':     'bigint',
     'FileField':         'varchar(%(max_length)s)',
     'FilePathField':     'varchar(%(max_length)s)',
     'FloatField':        'double precision',
@@ -113,7 +116,7 @@ class DatabaseCreation(BaseDatabaseCreation):
             links['host'] = settings_dict['HOST']
         if settings_dict['PORT']:
             links['port'] = str(settings_dict['PORT'])
-        kwargs.update(settings_dict['OPTIONS'])
+        kwargs.update(self.connection.connection_options())
         if len(links) > 0:
             kwargs['links'] = 'tcpip(' + ','.join(k+'='+v for k, v in list(links.items())) + ')'
         return Database.connect(**kwargs)
@@ -238,6 +241,13 @@ class DatabaseCreation(BaseDatabaseCreation):
 
         return outputs, pending
 
+    def sql_indexes_for_model(self, model, style):
+        "Returns the CREATE INDEX and CREATE TEXT INDEX statements for a single model"
+        output = super(DatabaseCreation, self).sql_indexes_for_model(model, style)
+        for index in text_indexes(model):
+            output.append(index.create_sql(model, self.connection) + ';')
+        return output
+
     def sql_for_many_to_many_field(self, model, f, style):
         "Return the CREATE TABLE + CREATE UNIQUE INDEX statements for a single m2m field"
         # Let BaseDatabaseCreation do most of the work
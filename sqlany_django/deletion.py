@@ -0,0 +1,148 @@
+"""
+Database-level cascading deletes.
+
+With the DB_CASCADE option on, foreign keys of relations with
+on_delete=CASCADE or SET_NULL are created with the matching ON DELETE
+action. Deletes made through the Collector of this module then leave those
+relations to the server, so that deleting an object takes one DELETE
+however many rows depend on it::
+
+    from sqlany_django.deletion import CascadeModel, CascadeQuerySet
+
+    class Order(CascadeModel):
+        ...
+        objects = CascadeQuerySet.as_manager()
+
+A relation is only left to the server when Django has nothing to do for any
+row below it: every relation further down is cascaded by the server too, and
+none of the models involved has delete signal listeners, parent models,
+generic relations or tables in the RESULT_CACHE allow-list.
+
+Only foreign keys created while the option is on carry the ON DELETE
+action; recreate older ones before turning it on.
+"""
+
+from django import VERSION as djangoVersion
+
+def _on_delete(field):
+    rel = getattr(field, 'remote_field', None) or field.rel
+    return rel.on_delete
+
+def db_on_delete(field, connection):
+    """
+    Returns the ON DELETE action the server takes for the foreign key field,
+    or None if deletes through it are handled by Django.
+    """
+    from django.db.models import CASCADE, SET_NULL
+    if connection.vendor != 'sqlanywhere' or not connection.backend_option('DB_CASCADE'):
+        return None
+    on_delete = _on_delete(field)
+    if on_delete is CASCADE:
+        return 'CASCADE'
+    if on_delete is SET_NULL:
+        return 'SET NULL'
+    return None
+
+def _has_delete_listeners(model):
+    from django.db.models import signals
+    return (signals.pre_delete.has_listeners(model) or
+            signals.post_delete.has_listeners(model) or
+            signals.m2m_changed.has_listeners(model))
+
+def server_handles(field, connection, seen=None):
+    """
+    Returns True if the server takes care of all rows affected through the
+    foreign key field when the rows it points to are deleted, so that the
+    deletion collector has nothing to do for them.
+    """
+    from django.db.models import DO_NOTHING
+    from django.db.models.deletion import get_candidate_relations_to_delete
+    action = db_on_delete(field, connection)
+    if action is None:
+        return False
+    model = field.model._meta.concrete_model
+    opts = model._meta
+    if connection.query_cache is not None and opts.db_table.lower() in connection.query_cache.tables:
+        # The server's changes wouldn't invalidate the cached results
+        return False
+    if action == 'SET NULL':
+        return True
+    if seen is None:
+        seen = set()
+    if model in seen:
+        return True
+    seen.add(model)
+    if _has_delete_listeners(model):
+        return False
+    if any(link != field for link in opts.parents.values()):
+        # The rows of parent models would be left behind
+        return False
+    if any(hasattr(f, 'bulk_related_objects')
+           for f in getattr(opts, 'private_fields', None) or opts.virtual_fields):
+        # Generic relations are deleted by Django only
+        return False
+    for related in get_candidate_relations_to_delete(opts):
+        if _on_delete(related.field) is not DO_NOTHING and \
+                not server_handles(related.field, connection, seen):
+            return False
+    return True
+
+if djangoVersion[:2] >= (1, 8):
+    # Collector.related_objects takes a relation object from 1.8 on
+    from django.db import connections, router
+    from django.db.models import Model, QuerySet
+    from django.db.models import deletion
+
+    class Collector(deletion.Collector):
+        """
+        A deletion collector that doesn't fetch the rows the server deletes
+        or updates itself.
+        """
+        def related_objects(self, related, objs):
+            if server_handles(related.field, connections[self.using]):
+                return related.related_model._base_manager.using(self.using).none()
+            return super(Collector, self).related_objects(related, objs)
+
+    class CascadeQuerySet(QuerySet):
+        def delete(self):
+            """
+            Deletes the records in the current QuerySet, leaving the
+            relations the server cascades to the server.
+            """
+            assert self.query.can_filter(), \
+                "Cannot use 'limit' or 'offset' with delete."
+            del_query = self._clone()
+            del_query._for_write = True
+            del_query.query.select_for_update = False
+            del_query.query.select_related = False
+            del_query.query.clear_ordering(force_empty=True)
+            collector = Collector(using=del_query.db)
+            collector.collect(del_query)
+            deleted = collector.delete()
+            self._result_cache = None
+            return deleted
+
+        delete.alters_data = True
+        delete.queryset_only = True
+
+    class CascadeModel(Model):
+        """
+        A model base class whose delete() leaves the relations the server
+        cascades to the server.
+        """
+        class Meta:
+            abstract = True
+
+        def delete(self, using=None, keep_parents=False):
+            using = using or router.db_for_write(self.__class__, instance=self)
+            assert self._get_pk_val() is not None, (
+                "%s object can't be deleted because its %s attribute is set to None." %
+                (self._meta.object_name, self._meta.pk.attname))
+            collector = Collector(using=using)
+            if djangoVersion[:2] >= (1, 9):
+                collector.collect([self], keep_parents=keep_parents)
+            else:
+                collector.collect([self])
+            return collector.delete()
+
+        delete.alters_data = True
@@ -0,0 +1,117 @@
+"""
+Query plans from SQL Anywhere's plan functions.
+
+explain() returns the plan the optimizer picks for a queryset::
+
+    from sqlany_django.explain import explain
+
+    print(explain(Sale.objects.filter(year=2015)))
+    xml = explain(Sale.objects.filter(year=2015), format='xml')
+
+The plan functions take the statement as text, so parameters are inlined as
+literals. Plans of slow statements can also be logged as they run, see the
+PLAN_CAPTURE backend option.
+"""
+
+import datetime, decimal, logging
+
+logger = logging.getLogger('sqlany_django.plans')
+
+try:
+    string_types = (basestring,)
+    integer_types = (int, long)
+except NameError:
+    string_types = (str,)
+    integer_types = (int,)
+
+# Plan function by format
+plan_functions = {
+    'text': 'PLAN',
+    'short': 'EXPLANATION',
+    'xml': 'GRAPHICAL_PLAN',
+}
+
+# Statements the plan functions accept
+_plannable = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'MERGE', 'WITH')
+
+def sql_literal(value):
+    """
+    Returns value as a SQL Anywhere literal.
+    """
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, integer_types + (decimal.Decimal,)):
+        return str(value)
+    if isinstance(value, float):
+        return repr(value)
+    if isinstance(value, bytearray) or (bytes is not str and isinstance(value, bytes)):
+        return '0x' + ''.join('%02x' % c for c in bytearray(value))
+    if isinstance(value, datetime.datetime):
+        value = value.isoformat(' ')
+    elif isinstance(value, (datetime.date, datetime.time)):
+        value = value.isoformat()
+    elif not isinstance(value, string_types):
+        value = str(value)
+    # Backslash is an escape character in SQL Anywhere string literals
+    return "'%s'" % value.replace('\\', '\\\\').replace("'", "''")
+
+def inline_params(sql, params):
+    """
+    Returns a statement with "format" style placeholders with its
+    parameters substituted as literals.
+    """
+    if not params:
+        return sql
+    return sql % tuple(sql_literal(p) for p in params)
+
+def query_plan(connection, sql, params=(), format='text'):
+    """
+    Returns the plan of a statement (with "format" style placeholders) on
+    the given SQL Anywhere connection.
+    """
+    try:
+        function = plan_functions[format]
+    except KeyError:
+        raise ValueError("Unknown plan format %r, use one of %s" %
+                         (format, ', '.join(sorted(plan_functions))))
+    connection.ensure_connection()
+    # Use a driver cursor: plans aren't cached, captured or time zone adjusted
+    cursor = connection.connection.cursor()
+    try:
+        cursor.execute('SELECT %s(?)' % function, (inline_params(sql, params),))
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+def explain(queryset, format='text'):
+    """
+    Returns the plan of queryset in the given format: 'text' (PLAN),
+    'short' (EXPLANATION) or 'xml' (GRAPHICAL_PLAN, as shown by the plan
+    viewer).
+    """
+    from django.db import connections
+    connection = connections[queryset.db]
+    if connection.vendor != 'sqlanywhere':
+        raise ValueError("explain() needs a SQL Anywhere database")
+    sql, params = queryset.query.get_compiler(using=queryset.db).as_sql()
+    return query_plan(connection, sql, params, format)
+
+def capture_plan(connection, sql, params, elapsed):
+    """
+    Logs the plan of a statement that took longer than the PLAN_CAPTURE
+    threshold of connection.
+    """
+    config = connection.plan_capture
+    if elapsed < config.get('THRESHOLD', 1.0):
+        return
+    if not sql.lstrip().upper().startswith(_plannable):
+        return
+    try:
+        plan = query_plan(connection, sql, params, config.get('FORMAT', 'text'))
+    except Exception as e:
+        logger.debug("Couldn't get the plan of a slow statement: %s", e)
+        return
+    logger.warning("Slow statement (%.3fs): %s\n%s", elapsed, sql, plan,
+                   extra={'duration': elapsed, 'sql': sql, 'params': params, 'plan': plan})
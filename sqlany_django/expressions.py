@@ -0,0 +1,197 @@
+"""
+Window functions and date arithmetic for SQL Anywhere.
+
+Window evaluates an aggregate or ranking function over a partition of the
+result, in the OVER clause of the select list::
+
+    from django.db.models import Sum
+    from sqlany_django.expressions import Window, Rank, RowRange
+
+    Score.objects.annotate(
+        rank=Window(Rank(), partition_by=['game'], order_by=['-points']),
+        running=Window(Sum('points'), partition_by=['player'], order_by=['played'],
+                       frame=RowRange(end=0)))
+
+Window functions are evaluated after WHERE, so top-N per group queries
+filter the annotated queryset in an outer query or in Python.
+
+Adding a duration (a timedelta, or a DurationField, stored as a number of
+microseconds) to a date or time compiles to DATEADD, and subtracting two
+dates or timestamps to the number of microseconds between them::
+
+    Session.objects.filter(started__lt=F('expires') - timedelta(hours=1))
+    Session.objects.update(expires=F('expires') + F('extension'))
+    Session.objects.annotate(length=ExpressionWrapper(
+        F('ended') - F('started'), output_field=DurationField()))
+
+Requires Django 1.8 or later.
+"""
+
+from django.db.models import F, FloatField, IntegerField
+from django.db.models.expressions import Expression, Func
+
+class Window(Expression):
+    template = '%(expression)s OVER (%(window)s)'
+    # The aggregate in a window doesn't group the query
+    contains_aggregate = False
+
+    def __init__(self, expression, partition_by=None, order_by=None, frame=None,
+                 output_field=None):
+        self.source_expression = expression
+        self.partition_by = [self._expression(e) for e in partition_by or ()]
+        self.order_by = [self._ordering(e) for e in order_by or ()]
+        self.frame = frame
+        super(Window, self).__init__(output_field=output_field)
+
+    def _expression(self, value):
+        return F(value) if not hasattr(value, 'resolve_expression') else value
+
+    def _ordering(self, value):
+        if hasattr(value, 'resolve_expression'):
+            return value
+        if value.startswith('-'):
+            return F(value[1:]).desc()
+        return F(value).asc()
+
+    def _resolve_output_field(self):
+        return self.source_expression.output_field
+
+    def get_source_expressions(self):
+        return [self.source_expression] + self.partition_by + self.order_by
+
+    def set_source_expressions(self, exprs):
+        self.source_expression = exprs[0]
+        self.partition_by = exprs[1:1 + len(self.partition_by)]
+        self.order_by = exprs[1 + len(self.partition_by):]
+
+    def as_sql(self, compiler, connection):
+        if not connection.features.supports_over_clause:
+            raise ValueError("This database backend does not support window expressions.")
+        expression_sql, params = compiler.compile(self.source_expression)
+        window = []
+        for clause, expressions in (('PARTITION BY', self.partition_by),
+                                    ('ORDER BY', self.order_by)):
+            if expressions:
+                sqls = []
+                for expression in expressions:
+                    sql, sql_params = compiler.compile(expression)
+                    sqls.append(sql)
+                    params.extend(sql_params)
+                window.append('%s %s' % (clause, ', '.join(sqls)))
+        if self.frame is not None:
+            window.append(self.frame.as_sql(connection))
+        return self.template % {'expression': expression_sql,
+                                'window': ' '.join(window)}, params
+
+    def get_group_by_cols(self):
+        return []
+
+class WindowFrame(object):
+    """
+    The rows of the partition a window function sees, from start to end
+    relative to the current row: None is unbounded, 0 the current row, a
+    negative number that many rows (or, for a ValueRange, that much of the
+    ordering value) before it and a positive number after it.
+    """
+    frame_type = None
+
+    def __init__(self, start=None, end=None):
+        self.start = start
+        self.end = end
+
+    def as_sql(self, connection):
+        if self.frame_type == 'ROWS':
+            start, end = connection.ops.window_frame_rows_start_end(self.start, self.end)
+        else:
+            start, end = connection.ops.window_frame_range_start_end(self.start, self.end)
+        return '%s BETWEEN %s AND %s' % (self.frame_type, start, end)
+
+class RowRange(WindowFrame):
+    frame_type = 'ROWS'
+
+class ValueRange(WindowFrame):
+    frame_type = 'RANGE'
+
+class RowNumber(Func):
+    function = 'ROW_NUMBER'
+
+    def __init__(self, **extra):
+        extra.setdefault('output_field', IntegerField())
+        super(RowNumber, self).__init__(**extra)
+
+class Rank(Func):
+    function = 'RANK'
+
+    def __init__(self, **extra):
+        extra.setdefault('output_field', IntegerField())
+        super(Rank, self).__init__(**extra)
+
+class DenseRank(Func):
+    function = 'DENSE_RANK'
+
+    def __init__(self, **extra):
+        extra.setdefault('output_field', IntegerField())
+        super(DenseRank, self).__init__(**extra)
+
+class PercentRank(Func):
+    function = 'PERCENT_RANK'
+
+    def __init__(self, **extra):
+        extra.setdefault('output_field', FloatField())
+        super(PercentRank, self).__init__(**extra)
+
+class CumeDist(Func):
+    function = 'CUME_DIST'
+
+    def __init__(self, **extra):
+        extra.setdefault('output_field', FloatField())
+        super(CumeDist, self).__init__(**extra)
+
+class FirstValue(Func):
+    function = 'FIRST_VALUE'
+
+class LastValue(Func):
+    function = 'LAST_VALUE'
+
+_temporal_types = ('DateField', 'DateTimeField', 'TimeField')
+
+def _internal_type(expression):
+    from django.core.exceptions import FieldError
+    try:
+        return expression.output_field.get_internal_type()
+    except FieldError:
+        return None
+
+def _combined_as_sqlanywhere(self, compiler, connection):
+    """
+    Compiles arithmetic between dates or times and durations with DATEADD
+    and DATEDIFF, durations being numbers of microseconds.
+    """
+    if self.connector not in (self.ADD, self.SUB):
+        return self.as_sql(compiler, connection)
+    lhs_type, rhs_type = _internal_type(self.lhs), _internal_type(self.rhs)
+    if lhs_type in _temporal_types and rhs_type == 'DurationField':
+        return connection.ops.duration_add_sql(self.connector, compiler.compile(self.lhs),
+                                               compiler.compile(self.rhs), lhs_type)
+    if (lhs_type == 'DurationField' and rhs_type in _temporal_types and
+            self.connector == self.ADD):
+        return connection.ops.duration_add_sql(self.connector, compiler.compile(self.rhs),
+                                               compiler.compile(self.lhs), rhs_type)
+    if (lhs_type in ('DateField', 'DateTimeField') and lhs_type == rhs_type and
+            self.connector == self.SUB):
+        return connection.ops.duration_between_sql(compiler.compile(self.lhs),
+                                                   compiler.compile(self.rhs))
+    return self.as_sql(compiler, connection)
+
+def _wrapper_as_sqlanywhere(self, compiler, connection):
+    # ExpressionWrapper.as_sql() bypasses the vendor hooks of its expression
+    return compiler.compile(self.expression)
+
+def register_expressions():
+    """
+    Installs the SQL Anywhere implementation of date and duration
+    arithmetic on Django's combined expressions.
+    """
+    from django.db.models.expressions import CombinedExpression, ExpressionWrapper
+    CombinedExpression.as_sqlanywhere = _combined_as_sqlanywhere
+    ExpressionWrapper.as_sqlanywhere = _wrapper_as_sqlanywhere
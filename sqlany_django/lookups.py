@@ -0,0 +1,159 @@
+"""
+SQL Anywhere specific lookup implementations.
+
+Regular expression lookups are planned before execution: literal patterns
+and patterns anchored on a literal prefix get an equality test or an
+index-friendly LIKE in front of the REGEXP test, which is still applied to
+the rows they select since REGEXP is case sensitive.
+
+Large IN lists on integer or string values are sent as a single delimited
+string, split on the server by sa_split_list(), so that the statement text
+(and its cached plan) doesn't change with the number of values.
+
+Installed through Django's vendor hook: the compiler calls
+as_sqlanywhere() on a lookup in preference to as_sql().
+"""
+
+from django import VERSION as djangoVersion
+
+try:
+    string_types = (basestring,)
+except NameError:
+    string_types = (str,)
+
+# Characters with a special meaning in SQL Anywhere regular expressions
+_regex_special = set('.^$*+?{}[]\\|()')
+
+def _is_escaped(pattern, i):
+    backslashes = 0
+    while i > 0 and pattern[i - 1] == '\\':
+        backslashes += 1
+        i -= 1
+    return backslashes % 2 == 1
+
+def literal_prefix(pattern):
+    """
+    Returns the literal text that every match of pattern starts with, and
+    whether the whole pattern is that literal text.
+    """
+    prefix = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\':
+            if i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+                char, step = pattern[i + 1], 2
+            else:
+                # A character class such as \d, or a trailing backslash
+                break
+        elif c in _regex_special:
+            break
+        else:
+            char, step = c, 1
+        if pattern[i + step:i + step + 1] in ('*', '?', '{', '+'):
+            # Quantified, so the character may not be (just once) in the match
+            break
+        prefix.append(char)
+        i += step
+    return ''.join(prefix), i == len(pattern)
+
+def _like_escape(value):
+    for c in ('\\', '%', '_', '[', ']'):
+        value = value.replace(c, '\\' + c)
+    return value
+
+def regex_plan(pattern):
+    """
+    Returns (template, params) testing a column against a regular
+    expression the way Django's regex lookup does (a match anywhere in the
+    value), where template has a %(lhs)s placeholder for the column. Returns
+    None if the pattern can't be analyzed.
+    """
+    if any(c == '|' and not _is_escaped(pattern, i) for i, c in enumerate(pattern)):
+        # Alternation makes anchors and prefixes apply to a branch only
+        return None
+    anchored_start = pattern.startswith('^')
+    body = pattern[1:] if anchored_start else pattern
+    anchored_end = body.endswith('$') and not _is_escaped(body, len(body) - 1)
+    if anchored_end:
+        body = body[:-1]
+    prefix, literal = literal_prefix(body)
+    # SQL Anywhere's REGEXP matches the whole value, so only pad the
+    # pattern at the ends that aren't anchored
+    regexp = ('' if anchored_start else '.*') + body + ('' if anchored_end else '.*')
+    # = and LIKE follow the collation, which usually ignores case, while
+    # REGEXP doesn't: they only narrow the rows the REGEXP test is run on
+    if literal and anchored_start and anchored_end:
+        return "(%(lhs)s = %%s AND %(lhs)s REGEXP %%s)", [prefix, regexp]
+    if literal:
+        like = ('' if anchored_start else '%') + _like_escape(prefix) + ('' if anchored_end else '%')
+        return "(%(lhs)s LIKE %%s ESCAPE '\\' AND %(lhs)s REGEXP %%s)", [like, regexp]
+    if anchored_start and prefix:
+        return ("(%(lhs)s LIKE %%s ESCAPE '\\' AND %(lhs)s REGEXP %%s)",
+                [_like_escape(prefix) + '%', regexp])
+    return "%(lhs)s REGEXP %%s", [regexp]
+
+def _regex_as_sqlanywhere(self, compiler, connection):
+    if (self.lookup_name != 'regex' or not self.rhs_is_direct_value() or
+            self.bilateral_transforms or not isinstance(self.rhs, string_types)):
+        return self.as_sql(compiler, connection)
+    plan = regex_plan(self.rhs)
+    if plan is None:
+        return self.as_sql(compiler, connection)
+    template, rhs_params = plan
+    lhs, lhs_params = self.process_lhs(compiler, connection)
+    lhs_params = list(lhs_params)
+    params = []
+    for i in range(template.count('%(lhs)s')):
+        params.extend(lhs_params)
+        if i < len(rhs_params):
+            params.append(rhs_params[i])
+    return template % {'lhs': lhs}, params
+
+try:
+    integer_types = (int, long)
+except NameError:
+    integer_types = (int,)
+
+# Delimiters tried, in order, for splitting lists of strings
+_split_delimiters = (',', '\x1f', '\x1e', '\x1d')
+
+def split_list_plan(values):
+    """
+    Returns (subquery, params) selecting values from a single delimited
+    string parameter, or None if values can't be passed that way.
+    """
+    if all(isinstance(v, integer_types) and not isinstance(v, bool) for v in values):
+        return ("SELECT CAST(row_value AS BIGINT) FROM sa_split_list(%s, ',')",
+                [','.join(str(v) for v in values)])
+    if all(isinstance(v, string_types) for v in values):
+        for delimiter in _split_delimiters:
+            if not any(delimiter in v for v in values):
+                return ("SELECT row_value FROM sa_split_list(%s, %s)",
+                        [delimiter.join(values), delimiter])
+    return None
+
+def _in_as_sqlanywhere(self, compiler, connection):
+    if (not self.rhs_is_direct_value() or self.bilateral_transforms or
+            len(self.rhs) <= connection.ops.large_in_list_size):
+        return self.as_sql(compiler, connection)
+    rhs, rhs_params = self.batch_process_rhs(compiler, connection)
+    if any(sql != '%s' for sql in rhs):
+        return self.as_sql(compiler, connection)
+    plan = split_list_plan(rhs_params)
+    if plan is None:
+        return self.as_sql(compiler, connection)
+    subquery, params = plan
+    lhs, lhs_params = self.process_lhs(compiler, connection)
+    return '%s IN (%s)' % (lhs, subquery), list(lhs_params) + params
+
+def register_lookups():
+    """
+    Installs the SQL Anywhere implementations on Django's comparison lookups.
+    """
+    if djangoVersion[:2] < (1, 8):
+        # Lookup classes were added in Django 1.7, vendor hooks in 1.8
+        return
+    from django.db.models import lookups
+    lookups.Regex.as_sqlanywhere = _regex_as_sqlanywhere
+    lookups.In.as_sqlanywhere = _in_as_sqlanywhere
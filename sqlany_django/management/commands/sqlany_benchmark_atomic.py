@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+class Command(BaseCommand):
+    help = ("Measures the throughput of nested atomic() blocks on a SQL Anywhere "
+            "database, with savepoints released, with a COMMIT per block (as "
+            "savepoints were handled before RELEASE SAVEPOINT was used) and "
+            "without savepoints.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help='The database to run the benchmark on.')
+        parser.add_argument('--iterations', type=int, default=1000,
+                            help='The number of nested blocks per run.')
+
+    def handle(self, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlanywhere':
+            raise CommandError("Database '%s' is not a SQL Anywhere database" % options['database'])
+        iterations = options['iterations']
+        cursor = connection.cursor()
+        cursor.execute("DECLARE LOCAL TEMPORARY TABLE sa_benchmark_atomic "
+                       "(n INTEGER NOT NULL) ON COMMIT PRESERVE ROWS")
+        try:
+            # The COMMIT run does by hand what atomic() did when savepoints
+            # were "committed" with COMMIT
+            for name, savepoint, commit in (('release savepoint', True, False),
+                                            ('commit per block', False, True),
+                                            ('no savepoints', False, False)):
+                cursor.execute("DELETE FROM sa_benchmark_atomic")
+                start = time.time()
+                with transaction.atomic(using=connection.alias):
+                    for i in range(iterations):
+                        with transaction.atomic(using=connection.alias, savepoint=savepoint):
+                            if commit:
+                                cursor.execute("SAVEPOINT sa_benchmark")
+                            cursor.execute("INSERT INTO sa_benchmark_atomic VALUES (%s)", [i])
+                            if commit:
+                                cursor.execute("COMMIT")
+                elapsed = time.time() - start
+                self.stdout.write("%-20s %8.3fs %10.1f blocks/s" %
+                                  (name, elapsed, iterations / elapsed if elapsed else 0))
+        finally:
+            cursor.execute("DROP TABLE sa_benchmark_atomic")
+            cursor.close()
@@ -0,0 +1,47 @@
+import sys
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from sqlany_django.unload import unload
+
+class Command(BaseCommand):
+    help = ("Exports the rows of a model's table from a SQL Anywhere database "
+            "with UNLOAD, without fetching them into Python.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', help='The model to export, as app_label.ModelName.')
+        parser.add_argument('output', help="The file to write, or '-' for standard output.")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help='The database to export from.')
+        parser.add_argument('--fields', default=None,
+                            help='Comma separated fields to export (default: all).')
+        parser.add_argument('--delimiter', default=',',
+                            help='The column delimiter.')
+        parser.add_argument('--quote', default='"',
+                            help='The character quoting string values.')
+        parser.add_argument('--no-quotes', action='store_false', dest='quotes',
+                            help="Don't quote string values.")
+        parser.add_argument('--no-escapes', action='store_false', dest='escapes',
+                            help="Don't escape special characters in values.")
+        parser.add_argument('--encoding', default='UTF-8',
+                            help='The character set of the file.')
+
+    def handle(self, **options):
+        database = options['database']
+        if connections[database].vendor != 'sqlanywhere':
+            raise CommandError("Database '%s' is not a SQL Anywhere database" % database)
+        try:
+            model = apps.get_model(options['model'])
+        except (LookupError, ValueError) as e:
+            raise CommandError(str(e))
+        queryset = model._default_manager.using(database).order_by()
+        if options['fields']:
+            queryset = queryset.values_list(*options['fields'].split(','))
+        formatting = dict((key, options[key]) for key in
+                          ('delimiter', 'quote', 'quotes', 'escapes', 'encoding'))
+        output = options['output']
+        if output == '-':
+            output = getattr(sys.stdout, 'buffer', sys.stdout)
+        unload(queryset, output, **formatting)
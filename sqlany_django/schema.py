@@ -1,4 +1,5 @@
 from django import VERSION as djangoVersion
+from sqlany_django.search import text_indexes
 
 if djangoVersion[:2] >= (1, 8):
     from django.db.backends.base.schema import BaseDatabaseSchemaEditor
@@ -29,4 +30,52 @@ class DatabaseSchemaEditor(BaseDatabaseSchemaEditor):
         - not applicable to SQL Anywhere
         """
         pass
+
+    def _create_fk_sql(self, model, field, suffix):
+        # Not imported with the backend: it defines a model class
+        from sqlany_django.deletion import db_on_delete
+        sql = super(DatabaseSchemaEditor, self)._create_fk_sql(model, field, suffix)
+        on_delete = db_on_delete(field, self.connection)
+        if on_delete is not None:
+            sql += " ON DELETE %s" % on_delete
+        return sql
+
+    def create_model(self, model):
+        super(DatabaseSchemaEditor, self).create_model(model)
+        for index in text_indexes(model):
+            self.create_text_index(model, index)
+
+    def create_text_index(self, model, index):
+        """
+        Creates a TEXT INDEX (see sqlany_django.search.TextIndex)
+        """
+        self.execute(index.create_sql(model, self.connection))
+
+    def delete_text_index(self, model, index):
+        self.execute(index.delete_sql(model, self.connection))
+
+    def refresh_text_index(self, model, index):
+        """
+        Rebuilds a MANUAL or AUTO refresh TEXT INDEX from the current data
+        """
+        self.execute(index.refresh_sql(model, self.connection))
+
+    def alter_text_indexes(self, model, old_text_indexes, new_text_indexes):
+        """
+        Deals with a model changing its text_indexes. Indexes are matched up
+        by name; an index whose columns or configuration changed is rebuilt,
+        one whose refresh mode changed is altered in place.
+        """
+        old = dict((i.get_name(model, self.connection), i) for i in old_text_indexes)
+        new = dict((i.get_name(model, self.connection), i) for i in new_text_indexes)
+        for name, index in old.items():
+            if name not in new or (index.fields, index.configuration) != \
+                    (new[name].fields, new[name].configuration):
+                self.delete_text_index(model, index)
+        for name, index in new.items():
+            if name not in old or (index.fields, index.configuration) != \
+                    (old[name].fields, old[name].configuration):
+                self.create_text_index(model, index)
+            elif index.refresh_clause() != old[name].refresh_clause():
+                self.execute(index.alter_sql(model, self.connection))
 #
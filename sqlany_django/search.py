@@ -0,0 +1,259 @@
+"""
+Full text search support for SQL Anywhere.
+
+TEXT INDEXes are declared with a text_indexes attribute on the model::
+
+    from sqlany_django.search import TextIndex
+
+    class Product(models.Model):
+        name = models.CharField(max_length=100)
+        description = models.TextField()
+
+        text_indexes = [TextIndex(['name', 'description'], refresh='AUTO', every=60)]
+
+and are created along with the table when it is created from the model
+itself (syncdb, or apps without migrations). Migrations don't know about
+them: add an AlterTextIndexes operation instead. They are used by Django's
+__search lookup (which compiles to CONTAINS) and by SearchScore, which
+annotates rows with their relevance::
+
+    Product.objects.filter(name__search='shoe').annotate(
+        score=SearchScore('name', 'shoe')).order_by('-score')
+"""
+
+from django import VERSION as djangoVersion
+from django.db.models import FloatField
+
+if djangoVersion[:2] >= (1, 8):
+    from django.db.models import Func, Value
+    from django.db.models.sql.constants import LOUTER
+    from django.db.models.sql.datastructures import Join
+
+REFRESH_MODES = ('IMMEDIATE', 'MANUAL', 'AUTO')
+
+class TextIndex(object):
+    """
+    A SQL Anywhere TEXT INDEX on one or more columns of a model.
+
+    refresh is one of 'IMMEDIATE' (maintained on every change), 'MANUAL'
+    (only by REFRESH TEXT INDEX) or 'AUTO' (refreshed in the background every
+    `every` minutes).
+    """
+    sql_create = "CREATE TEXT INDEX %(name)s ON %(table)s (%(columns)s)%(extra)s"
+    sql_alter = "ALTER TEXT INDEX %(name)s ON %(table)s %(refresh)s"
+    sql_refresh = "REFRESH TEXT INDEX %(name)s ON %(table)s"
+    sql_delete = "DROP TEXT INDEX %(name)s ON %(table)s"
+
+    def __init__(self, fields, name=None, refresh='IMMEDIATE', every=None, configuration=None):
+        if refresh not in REFRESH_MODES:
+            raise ValueError("TextIndex refresh must be one of %s" % ', '.join(REFRESH_MODES))
+        if every is not None and refresh != 'AUTO':
+            raise ValueError("TextIndex every is only valid with refresh='AUTO'")
+        self.fields = list(fields)
+        self.name = name
+        self.refresh = refresh
+        self.every = every
+        self.configuration = configuration
+
+    def deconstruct(self):
+        kwargs = {}
+        if self.name is not None:
+            kwargs['name'] = self.name
+        if self.refresh != 'IMMEDIATE':
+            kwargs['refresh'] = self.refresh
+        if self.every is not None:
+            kwargs['every'] = self.every
+        if self.configuration is not None:
+            kwargs['configuration'] = self.configuration
+        return ('sqlany_django.search.TextIndex', (self.fields,), kwargs)
+
+    def __eq__(self, other):
+        return isinstance(other, TextIndex) and self.deconstruct() == other.deconstruct()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return '<TextIndex: %s>' % ', '.join(self.fields)
+
+    def get_name(self, model, connection):
+        if self.name is not None:
+            return self.name
+        if djangoVersion[:2] >= (1, 7):
+            from django.db.backends.utils import truncate_name
+        else:
+            from django.db.backends.util import truncate_name
+        columns = [model._meta.get_field(f).column for f in self.fields]
+        return truncate_name('%s_%s_text' % (model._meta.db_table, '_'.join(columns)),
+                             connection.ops.max_name_length())
+
+    def refresh_clause(self):
+        if self.refresh == 'AUTO' and self.every is not None:
+            return 'AUTO REFRESH EVERY %d MINUTES' % self.every
+        return '%s REFRESH' % self.refresh
+
+    def _params(self, model, connection):
+        qn = connection.ops.quote_name
+        return {'name': qn(self.get_name(model, connection)),
+                'table': qn(model._meta.db_table)}
+
+    def create_sql(self, model, connection):
+        qn = connection.ops.quote_name
+        params = self._params(model, connection)
+        params['columns'] = ', '.join(qn(model._meta.get_field(f).column) for f in self.fields)
+        extra = ''
+        if self.configuration is not None:
+            extra += ' CONFIGURATION %s' % qn(self.configuration)
+        params['extra'] = extra + ' ' + self.refresh_clause()
+        return self.sql_create % params
+
+    def alter_sql(self, model, connection):
+        params = self._params(model, connection)
+        params['refresh'] = self.refresh_clause()
+        return self.sql_alter % params
+
+    def refresh_sql(self, model, connection):
+        return self.sql_refresh % self._params(model, connection)
+
+    def delete_sql(self, model, connection):
+        return self.sql_delete % self._params(model, connection)
+
+def text_indexes(model):
+    """
+    Returns the TextIndexes declared by the text_indexes attribute of the
+    given model.
+    """
+    return list(getattr(model, 'text_indexes', None) or ())
+
+if djangoVersion[:2] >= (1, 8):
+    class _ContainsRelation(object):
+        """
+        What a ContainsJoin joins along: the rows of the model of a
+        text-indexed column matching a CONTAINS query.
+        """
+        def __init__(self, field, query):
+            self.field = field
+            self.query = query
+
+        def get_joining_columns(self):
+            pk = self.field.model._meta.pk.column
+            return ((pk, pk),)
+
+        def get_extra_restriction(self, where_class, alias, related_alias):
+            return None
+
+    class ContainsJoin(Join):
+        """
+        A LEFT OUTER JOIN of the scores of one CONTAINS query, so that the
+        text index is searched once per query rather than once per row.
+        """
+        def as_sql(self, compiler, connection):
+            qn = compiler.quote_name_unless_alias
+            qn2 = connection.ops.quote_name
+            field = self.join_field.field
+            opts = field.model._meta
+            query_sql, params = compiler.compile(self.join_field.query)
+            sql = ('%(join_type)s (SELECT %(pk)s, "sa_contains"."score" FROM %(table)s '
+                   'CONTAINS (%(column)s, %(query)s) AS "sa_contains") AS %(alias)s '
+                   'ON (%(parent)s.%(pk)s = %(alias)s.%(pk)s)' %
+                   {'join_type': self.join_type,
+                    'pk': qn2(opts.pk.column),
+                    'table': qn2(opts.db_table),
+                    'column': qn2(field.column),
+                    'query': query_sql,
+                    'alias': qn(self.table_alias),
+                    'parent': qn(self.parent_alias)})
+            return sql, list(params)
+
+    class SearchScore(Func):
+        """
+        The relevance score (0 to 1) of a text-indexed column against a
+        CONTAINS query, as computed by the text index; NULL for rows that
+        don't match.
+        """
+        def __init__(self, expression, query, **extra):
+            extra.setdefault('output_field', FloatField())
+            if not hasattr(query, 'resolve_expression'):
+                query = Value(query)
+            super(SearchScore, self).__init__(expression, query, **extra)
+            self.alias = None
+
+        def resolve_expression(self, query=None, allow_joins=True, reuse=None,
+                               summarize=False, for_save=False):
+            c = super(SearchScore, self).resolve_expression(query, allow_joins, reuse,
+                                                            summarize, for_save)
+            column, search = c.source_expressions
+            if not hasattr(column, 'target') or not hasattr(column, 'alias'):
+                raise ValueError("SearchScore needs a model column, not %r" % column)
+            # CONTAINS only yields a score in a FROM clause
+            join = ContainsJoin('sa_score', column.alias, None, LOUTER,
+                                _ContainsRelation(column.target, search), True)
+            c.alias = query.join(join)
+            return c
+
+        def relabeled_clone(self, change_map):
+            clone = super(SearchScore, self).relabeled_clone(change_map)
+            clone.alias = change_map.get(self.alias, self.alias)
+            return clone
+
+        def as_sql(self, compiler, connection):
+            if self.alias is None:
+                raise ValueError("SearchScore must be resolved against a query.")
+            return '%s."score"' % compiler.quote_name_unless_alias(self.alias), []
+
+if djangoVersion[:2] >= (1, 7):
+    from django.db.migrations.operations.base import Operation
+
+    class AlterTextIndexes(Operation):
+        """
+        Changes the TEXT INDEXes of a model from the `previous` list to the
+        given one, creating, altering and dropping indexes as needed. Text
+        indexes aren't part of the migration state, so previous has to be
+        given when the model already had some; the operation is reversed by
+        going back to previous.
+        """
+        def __init__(self, name, text_indexes, previous=()):
+            self.name = name
+            self.text_indexes = list(text_indexes)
+            self.previous = list(previous)
+
+        @property
+        def name_lower(self):
+            return self.name.lower()
+
+        def deconstruct(self):
+            kwargs = {
+                'name': self.name,
+                'text_indexes': self.text_indexes,
+            }
+            if self.previous:
+                kwargs['previous'] = self.previous
+            return (
+                self.__class__.__name__,
+                [],
+                kwargs
+            )
+
+        def state_forwards(self, app_label, state):
+            pass
+
+        def _alter(self, app_label, schema_editor, state, old, new):
+            if schema_editor.connection.vendor != 'sqlanywhere':
+                return
+            if djangoVersion[:2] >= (1, 8):
+                model = state.apps.get_model(app_label, self.name)
+            else:
+                model = state.render().get_model(app_label, self.name)
+            schema_editor.alter_text_indexes(model, old, new)
+
+        def database_forwards(self, app_label, schema_editor, from_state, to_state):
+            self._alter(app_label, schema_editor, to_state, self.previous, self.text_indexes)
+
+        def database_backwards(self, app_label, schema_editor, from_state, to_state):
+            self._alter(app_label, schema_editor, to_state, self.text_indexes, self.previous)
+
+        def references_model(self, name, app_label=None):
+            return name.lower() == self.name_lower
+
+        def describe(self):
+            return "Alter text indexes for %s (%s index(es))" % (self.name, len(self.text_indexes))
@@ -0,0 +1,250 @@
+"""
+Reads and writes large column values in pieces.
+
+open_value() returns a file-like object for one column of one row, so that
+LONG VARCHAR and LONG BINARY values never have to be held in memory whole::
+
+    from sqlany_django.streaming import open_value
+
+    with open_value(attachment, 'data') as f:
+        for chunk in f:
+            response.write(chunk)
+
+    with open_value(attachment, 'data', 'w') as f:
+        for chunk in upload.chunks():
+            f.write(chunk)
+
+Values are read with BYTE_SUBSTR, one chunk of chunk_size bytes per
+request, and text is decoded from the database character set as it
+arrives. Writes insert each chunk into a local temporary table, and
+closing the file replaces the column with their concatenation in a single
+UPDATE, so the row is only locked (and the value only logged) once; if the
+with block raises, the column is left alone.
+
+Reads see each chunk as committed when it is read; read inside atomic() at
+a repeatable read or snapshot isolation level to see a consistent value.
+"""
+
+import codecs
+import itertools
+
+from django.db import connections, router
+
+from sqlany_django.base import Database
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# Names the chunk table of each writer
+_writer_ids = itertools.count(1)
+
+def _is_binary(field):
+    return field.get_internal_type() == 'BinaryField'
+
+def _codec(charset):
+    # SQL Anywhere names such as 'ISO_8859-1:1987' carry a year
+    for name in (charset, charset.split(':')[0]):
+        try:
+            return codecs.lookup(name).name
+        except LookupError:
+            pass
+    raise ValueError("No Python codec for the database character set %r" % charset)
+
+class _ValueFile(object):
+    def __init__(self, model, pk, field_name, chunk_size=None, using=None):
+        self.model = model
+        self.pk = pk
+        self.field = model._meta.get_field(field_name)
+        self.binary = _is_binary(self.field)
+        self.chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+        if using is None:
+            using = router.db_for_read(model) if self.mode == 'r' else router.db_for_write(model)
+        self.using = using
+        self.connection = connections[using]
+        qn = self.connection.ops.quote_name
+        self.table = qn(model._meta.db_table)
+        self.column = qn(self.field.column)
+        self.pk_column = qn(model._meta.pk.column)
+        self.closed = False
+
+    def _empty(self):
+        return b'' if self.binary else ''
+
+    def _does_not_exist(self):
+        return self.model.DoesNotExist("%s matching query does not exist." %
+                                       self.model._meta.object_name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class ValueReader(_ValueFile):
+    """
+    Reads a column value in chunks of at most chunk_size bytes. Positions
+    are byte offsets for text values too. A NULL reads as an empty value.
+    """
+    mode = 'r'
+
+    def __init__(self, *args, **kwargs):
+        super(ValueReader, self).__init__(*args, **kwargs)
+        self.position = 0
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("SELECT BYTE_LENGTH(%s) FROM %s WHERE %s = %%s" %
+                           (self.column, self.table, self.pk_column), [self.pk])
+            row = cursor.fetchone()
+            if row is not None and not self.binary:
+                cursor.execute("SELECT DB_PROPERTY('CharSet')")
+                self.encoding = _codec(cursor.fetchone()[0])
+        finally:
+            cursor.close()
+        if row is None:
+            raise self._does_not_exist()
+        self.length = row[0] or 0
+        self._reset_decoder()
+
+    def _reset_decoder(self):
+        # A chunk may end in the middle of a multibyte character
+        self.decoder = None if self.binary else codecs.getincrementaldecoder(self.encoding)()
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset):
+        self.position = max(0, min(offset, self.length))
+        self._reset_decoder()
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            return self._empty().join(self)
+        size = min(size, self.length - self.position)
+        if size <= 0:
+            return self._empty()
+        cursor = self.connection.cursor()
+        try:
+            # BYTE_SUBSTR counts from 1; text is read as bytes and decoded
+            # here so that chunks can split characters
+            cursor.execute("SELECT CAST(BYTE_SUBSTR(%s, %%s, %%s) AS LONG BINARY) "
+                           "FROM %s WHERE %s = %%s" % (self.column, self.table, self.pk_column),
+                           [self.position + 1, size, self.pk])
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+        if row is None:
+            raise self._does_not_exist()
+        data = bytes(row[0]) if row[0] is not None else b''
+        self.position += len(data)
+        if self.binary:
+            return data
+        return self.decoder.decode(data, final=self.position >= self.length)
+
+    def __iter__(self):
+        while self.position < self.length:
+            data = self.read(self.chunk_size)
+            if data:
+                yield data
+
+    def close(self):
+        self.closed = True
+
+class ValueWriter(_ValueFile):
+    """
+    Replaces a column value with the data written to it. Chunks of
+    chunk_size are kept in a temporary table until close() stores them.
+    """
+    mode = 'w'
+
+    def __init__(self, *args, **kwargs):
+        super(ValueWriter, self).__init__(*args, **kwargs)
+        self.buffer = []
+        self.buffered = 0
+        self.chunks = 0
+        self.chunk_table = self.connection.ops.quote_name('sa_value_chunks_%d' % next(_writer_ids))
+        self.cursor = self.connection.cursor()
+        try:
+            self.cursor.execute("SELECT 1 FROM %s WHERE %s = %%s" %
+                                (self.table, self.pk_column), [self.pk])
+            if self.cursor.fetchone() is None:
+                raise self._does_not_exist()
+            # Neither declaring nor dropping a local temporary table commits
+            self.cursor.execute("DECLARE LOCAL TEMPORARY TABLE %s "
+                                "(seq INTEGER NOT NULL PRIMARY KEY, chunk %s) NOT TRANSACTIONAL" %
+                                (self.chunk_table, 'LONG BINARY' if self.binary else 'LONG VARCHAR'))
+        except Exception:
+            self.cursor.close()
+            self.closed = True
+            raise
+
+    def _param(self, data):
+        return Database.Binary(data) if self.binary else data
+
+    def write(self, data):
+        if self.closed:
+            raise ValueError("I/O operation on closed value")
+        self.buffer.append(data)
+        self.buffered += len(data)
+        if self.buffered >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        data = self._empty().join(self.buffer)
+        self.buffer = []
+        self.buffered = 0
+        self.chunks += 1
+        self.cursor.execute("INSERT INTO %s (seq, chunk) VALUES (%%s, %%s)" % self.chunk_table,
+                            [self.chunks, self._param(data)])
+
+    def close(self):
+        """
+        Stores the value written and commits it, unless a transaction is
+        already in progress.
+        """
+        if self.closed:
+            return
+        try:
+            self.flush()
+            value = "COALESCE((SELECT LIST(chunk, '' ORDER BY seq) FROM %s), %%s)" % self.chunk_table
+            if self.binary:
+                value = "CAST(%s AS LONG BINARY)" % value
+            self.cursor.execute("UPDATE %s SET %s = %s WHERE %s = %%s" %
+                                (self.table, self.column, value, self.pk_column),
+                                [self._param(self._empty()), self.pk])
+            if self.cursor.rowcount == 0:
+                raise self._does_not_exist()
+        finally:
+            self.discard()
+
+    def discard(self):
+        """
+        Throws away what was written, leaving the column as it was.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.buffer = []
+        try:
+            self.cursor.execute("DROP TABLE %s" % self.chunk_table)
+        finally:
+            self.cursor.close()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.discard()
+        else:
+            self.close()
+
+def open_value(instance, field_name, mode='r', chunk_size=None):
+    """
+    Opens the value of field_name in the row of a saved model instance for
+    reading ('r') or replacing ('w').
+    """
+    if instance.pk is None:
+        raise ValueError("open_value() needs a saved instance.")
+    if mode not in ('r', 'w'):
+        raise ValueError("open_value() mode must be 'r' or 'w'")
+    cls = ValueReader if mode == 'r' else ValueWriter
+    return cls(instance.__class__, instance.pk, field_name, chunk_size,
+               using=instance._state.db)
@@ -0,0 +1,191 @@
+"""
+Transaction helpers for SQL Anywhere.
+
+atomic() works like django.db.transaction.atomic() but can also choose the
+isolation level of the transaction it starts::
+
+    from sqlany_django.transaction import atomic
+
+    with atomic(isolation_level='snapshot'):
+        ...
+
+The level is set once when the outermost block starts and the connection's
+default (the ISOLATION_LEVEL option, or the database's) is restored when it
+ends. Nested blocks may not ask for a different level.
+
+retry_atomic() runs a function in a transaction, retrying it when the
+transaction hits a deadlock or lock timeout.
+
+LockingQuerySet adds the skip_locked argument of Django 1.11 to
+select_for_update(), so that workers can claim rows others have locked
+without waiting for them::
+
+    job = Job.objects.select_for_update(skip_locked=True).filter(done=False).first()
+
+Requires Django 1.6 or later.
+"""
+
+import logging, random, threading, time
+from functools import wraps
+
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+from django.db.models import QuerySet
+from django.db.models.sql import Query
+from django.db.transaction import Atomic, TransactionManagementError, get_connection
+from django.dispatch import Signal
+
+from sqlany_django.base import Database, DeadlockError, LockTimeoutError
+
+logger = logging.getLogger('sqlany_django.transaction')
+
+class IsolatedAtomic(Atomic):
+    def __init__(self, using, savepoint, isolation_level=None):
+        super(IsolatedAtomic, self).__init__(using, savepoint)
+        self.isolation_level = isolation_level
+
+    def __enter__(self):
+        connection = get_connection(self.using)
+        if self.isolation_level is not None and connection.vendor == 'sqlanywhere':
+            level = connection.isolation_level_value(self.isolation_level)
+            if not connection.in_atomic_block:
+                previous = connection.set_isolation_level(level)
+                connection.isolation_level_stack.append(previous)
+            elif level != connection.get_isolation_level():
+                raise TransactionManagementError(
+                    "The isolation level can't be changed inside a transaction.")
+        super(IsolatedAtomic, self).__enter__()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        connection = get_connection(self.using)
+        try:
+            super(IsolatedAtomic, self).__exit__(exc_type, exc_value, traceback)
+        finally:
+            if (self.isolation_level is not None and connection.vendor == 'sqlanywhere' and
+                    not connection.in_atomic_block and connection.isolation_level_stack):
+                previous = connection.isolation_level_stack.pop()
+                if connection.connection is not None:
+                    connection.set_isolation_level(previous)
+
+def atomic(using=None, savepoint=True, isolation_level=None):
+    # Bare decorator: @atomic -- although the first argument is called
+    # `using`, it's actually the function being decorated.
+    if callable(using):
+        return IsolatedAtomic(DEFAULT_DB_ALIAS, savepoint, isolation_level)(using)
+    # Decorator: @atomic(...) or context manager: with atomic(...): ...
+    else:
+        return IsolatedAtomic(using, savepoint, isolation_level)
+
+def lock_conflict(exc):
+    """
+    Returns the DeadlockError or LockTimeoutError that exc is, or was raised
+    from, or None if it isn't a lock conflict.
+    """
+    while exc is not None:
+        if isinstance(exc, (DeadlockError, LockTimeoutError)):
+            return exc
+        exc = getattr(exc, '__cause__', None)
+    return None
+
+# Sent each time retry_atomic() is about to retry a transaction
+transaction_retried = Signal(providing_args=['using', 'attempt', 'delay', 'exception'])
+
+# Totals over all retry_atomic() calls in this process
+retry_stats = {'retried': 0, 'deadlocks': 0, 'lock_timeouts': 0, 'exhausted': 0}
+_retry_stats_lock = threading.Lock()
+
+def _count(key):
+    with _retry_stats_lock:
+        retry_stats[key] += 1
+
+class RetryAtomic(object):
+    """
+    Runs a function in its own transaction, running it again from the start
+    if the transaction fails because of a deadlock or lock timeout. Retries
+    wait a random time of up to backoff * 2**attempt seconds (but no more
+    than max_backoff) and stop after `attempts` tries in all.
+    """
+    def __init__(self, using, savepoint, isolation_level, attempts, backoff, max_backoff):
+        self.using = using
+        self.savepoint = savepoint
+        self.isolation_level = isolation_level
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def __call__(self, func):
+        @wraps(func)
+        def inner(*args, **kwargs):
+            return self.run(func, *args, **kwargs)
+        return inner
+
+    def run(self, func, *args, **kwargs):
+        connection = get_connection(self.using)
+        if connection.in_atomic_block:
+            # The enclosing transaction is lost on a conflict anyway, so
+            # only the outermost block can retry
+            with IsolatedAtomic(self.using, self.savepoint, self.isolation_level):
+                return func(*args, **kwargs)
+        attempt = 1
+        while True:
+            try:
+                with IsolatedAtomic(self.using, self.savepoint, self.isolation_level):
+                    return func(*args, **kwargs)
+            except (DatabaseError, Database.DatabaseError) as e:
+                conflict = lock_conflict(e)
+                if conflict is None:
+                    raise
+                _count('deadlocks' if isinstance(conflict, DeadlockError) else 'lock_timeouts')
+                if attempt >= self.attempts:
+                    _count('exhausted')
+                    logger.warning("Giving up after %d attempts: %s", attempt, e)
+                    raise
+                delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+                _count('retried')
+                logger.info("Retrying transaction (attempt %d) in %.3fs after %s", attempt + 1, delay, e)
+                transaction_retried.send(sender=self.__class__, using=connection.alias,
+                                         attempt=attempt, delay=delay, exception=e)
+                time.sleep(delay)
+                attempt += 1
+
+def retry_atomic(using=None, savepoint=True, isolation_level=None, attempts=3,
+                 backoff=0.05, max_backoff=1.0):
+    """
+    Like atomic(), but the decorated function is run again when its
+    transaction is rolled back by a deadlock or lock timeout::
+
+        @retry_atomic(attempts=5)
+        def claim(job_id):
+            ...
+
+    The function must be safe to run more than once. Use retry_atomic(...).run(
+    func, *args) to run a function without decorating it.
+    """
+    # Bare decorator: @retry_atomic
+    if callable(using):
+        return RetryAtomic(DEFAULT_DB_ALIAS, savepoint, isolation_level, attempts,
+                           backoff, max_backoff)(using)
+    return RetryAtomic(using, savepoint, isolation_level, attempts, backoff, max_backoff)
+
+class LockingQuery(Query):
+    select_for_update_skip_locked = False
+
+    def clone(self, *args, **kwargs):
+        obj = super(LockingQuery, self).clone(*args, **kwargs)
+        obj.select_for_update_skip_locked = self.select_for_update_skip_locked
+        return obj
+
+class LockingQuerySet(QuerySet):
+    """
+    A QuerySet whose select_for_update() also takes skip_locked, compiled
+    to a READPAST table hint. Use LockingQuerySet.as_manager() as the
+    model's manager.
+    """
+    def __init__(self, model=None, query=None, *args, **kwargs):
+        super(LockingQuerySet, self).__init__(model, query or LockingQuery(model), *args, **kwargs)
+
+    def select_for_update(self, nowait=False, skip_locked=False):
+        if nowait and skip_locked:
+            raise ValueError("The nowait option cannot be used with skip_locked.")
+        obj = super(LockingQuerySet, self).select_for_update(nowait=nowait)
+        obj.query.select_for_update_skip_locked = skip_locked
+        return obj
@@ -0,0 +1,82 @@
+"""
+Exports querysets with UNLOAD.
+
+The server formats the rows itself and sends them straight to a file on the
+client, so no row passes through Python::
+
+    from sqlany_django.unload import unload
+
+    unload(Sale.objects.filter(year=2015).values_list('id', 'amount'), 'sales.csv')
+
+A file-like object (opened in binary mode) may be given instead of a file
+name; the rows are then unloaded to a temporary file and copied to it in
+chunks.
+
+The database option allow_write_client_file must be On, and on SQL Anywhere
+16 and later the user needs the WRITE CLIENT FILE privilege.
+"""
+
+import os, shutil, tempfile
+
+from django.db import connections
+
+try:
+    string_types = (basestring,)
+except NameError:
+    string_types = (str,)
+
+COPY_CHUNK_SIZE = 64 * 1024
+
+def _string(value):
+    # Backslash is an escape character in SQL Anywhere string literals
+    return "'%s'" % value.replace('\\', '\\\\').replace("'", "''")
+
+def _literal(value, params):
+    value = _string(value)
+    # The statement is formatted with its parameters before it's run
+    return value.replace('%', '%%') if params else value
+
+def unload_sql(queryset, path, delimiter=',', row_delimiter=None, quote='"',
+               quotes=True, escapes=True, encoding='UTF-8'):
+    """
+    Returns the UNLOAD statement and its parameters that write the results of
+    queryset to the client file path.
+    """
+    compiler = queryset.query.get_compiler(using=queryset.db)
+    sql, params = compiler.as_sql()
+    clauses = ['DELIMITED BY %s' % _literal(delimiter, params)]
+    if row_delimiter is not None:
+        clauses.append('ROW DELIMITED BY %s' % _literal(row_delimiter, params))
+    if quotes:
+        clauses.append('QUOTE %s' % _literal(quote, params))
+    clauses.append('QUOTES %s' % ('ON' if quotes else 'OFF'))
+    clauses.append('ESCAPES %s' % ('ON' if escapes else 'OFF'))
+    if encoding is not None:
+        clauses.append('ENCODING %s' % _literal(encoding, params))
+    return ('UNLOAD %s INTO CLIENT FILE %s FORMAT TEXT %s' %
+            (sql, _literal(path, params), ' '.join(clauses))), params
+
+def unload(queryset, destination, **options):
+    """
+    Writes the results of queryset to destination, a file name or a binary
+    file-like object. options are the formatting options of unload_sql().
+    """
+    if isinstance(destination, string_types):
+        _unload_to_file(queryset, os.path.abspath(destination), options)
+        return
+    fd, path = tempfile.mkstemp(suffix='.unload')
+    os.close(fd)
+    try:
+        _unload_to_file(queryset, path, options)
+        with open(path, 'rb') as f:
+            shutil.copyfileobj(f, destination, COPY_CHUNK_SIZE)
+    finally:
+        os.remove(path)
+
+def _unload_to_file(queryset, path, options):
+    sql, params = unload_sql(queryset, path, **options)
+    cursor = connections[queryset.db].cursor()
+    try:
+        cursor.execute(sql, params)
+    finally:
+        cursor.close()
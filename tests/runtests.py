@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+"""
+Runs the backend tests against a SQL Anywhere server:
+
+    python tests/runtests.py [test labels]
+
+The server is given by the SQLANY_NAME, SQLANY_USER, SQLANY_PASSWORD,
+SQLANY_HOST and SQLANY_PORT environment variables, which default to the
+values used in the README. Django's test runner creates (and drops) the
+test database.
+"""
+
+import os, sys
+
+def main(labels):
+    here = os.path.dirname(os.path.abspath(__file__))
+    sys.path[:0] = [here, os.path.dirname(here)]
+
+    import django
+    from django.conf import settings
+    from django.test.utils import get_runner
+
+    settings.configure(
+        DATABASES={
+            'default': {
+                'ENGINE': 'sqlany_django',
+                'NAME': os.environ.get('SQLANY_NAME', 'django'),
+                'USER': os.environ.get('SQLANY_USER', 'dba'),
+                'PASSWORD': os.environ.get('SQLANY_PASSWORD', 'sql'),
+                'HOST': os.environ.get('SQLANY_HOST', 'localhost'),
+                'PORT': os.environ.get('SQLANY_PORT', '2638'),
+            }
+        },
+        INSTALLED_APPS=['sqlany_tests'],
+        SECRET_KEY='sqlany_django tests',
+        USE_TZ=False,
+    )
+    django.setup()
+    runner = get_runner(settings)(verbosity=1)
+    return runner.run_tests(labels or ['sqlany_tests'])
+
+if __name__ == '__main__':
+    sys.exit(bool(main(sys.argv[1:])))
@@ -0,0 +1,16 @@
+from django.db import models
+
+class Event(models.Model):
+    name = models.CharField(max_length=100)
+    started = models.DateTimeField()
+    ended = models.DateTimeField(null=True)
+    day = models.DateField(null=True)
+    points = models.IntegerField(default=0)
+
+class Attachment(models.Model):
+    text = models.TextField(blank=True)
+    data = models.BinaryField(null=True)
+
+class Registration(models.Model):
+    event = models.ForeignKey(Event)
+    name = models.CharField(max_length=100)
@@ -0,0 +1,73 @@
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from django.db import connection
+from django.test import SimpleTestCase
+
+from sqlany_django import bulk
+
+from .models import Event
+
+class RecordingCursor(object):
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, sql, params):
+        self.statements.append((sql, params))
+        self.rowcount = sql.count('SELECT ')
+
+    def close(self):
+        pass
+
+class MergeSQLTests(SimpleTestCase):
+    def test_merge(self):
+        fields = [Event._meta.get_field('name'), Event._meta.get_field('points')]
+        sql = bulk.merge_sql(Event, fields, 2, connection)
+        row = ('SELECT CAST(%s AS integer) AS "id", CAST(%s AS varchar(100)) AS "name", '
+               'CAST(%s AS integer) AS "points" FROM dummy')
+        self.assertEqual(sql, 'MERGE INTO "sqlany_tests_event" USING (%s UNION ALL %s) AS "sa_rows" '
+                              'ON "sqlany_tests_event"."id" = "sa_rows"."id" '
+                              'WHEN MATCHED THEN UPDATE SET "name" = "sa_rows"."name", '
+                              '"points" = "sa_rows"."points"' % (row, row))
+        self.assertEqual(sql.count('%s'), 6)
+
+    def test_cast_type(self):
+        # No DEFAULT AUTOINCREMENT or NULL in a CAST
+        self.assertEqual(bulk._cast_type(Event._meta.pk, connection), 'integer')
+        self.assertEqual(bulk._cast_type(Event._meta.get_field('ended'), connection), 'datetime')
+        with mock.patch.object(Event._meta.pk, 'db_type', return_value='bit NOT NULL'):
+            self.assertEqual(bulk._cast_type(Event._meta.pk, connection), 'bit')
+
+class BulkUpdateBatchTests(SimpleTestCase):
+    def bulk_update(self, objs, fields, **kwargs):
+        cursor = RecordingCursor()
+        with mock.patch.object(bulk.transaction, 'atomic', mock.MagicMock()), \
+                mock.patch.object(connection, 'cursor', return_value=cursor):
+            updated = bulk.bulk_update(objs, fields, using=connection.alias, **kwargs)
+        return updated, cursor.statements
+
+    def test_parameter_limit(self):
+        objs = [Event(pk=i, name='e%d' % i, points=i) for i in range(1, 40001)]
+        updated, statements = self.bulk_update(objs, ['name', 'points'])
+        self.assertEqual(updated, 40000)
+        # Three parameters a row: 10922 rows take 32766 of the 32767 allowed
+        self.assertEqual([len(params) for sql, params in statements],
+                         [32766, 32766, 32766, 40000 * 3 - 3 * 32766])
+        for sql, params in statements:
+            self.assertEqual(sql.count('%s'), len(params))
+        self.assertEqual(statements[0][1][:3], [1, 'e1', 1])
+
+    def test_batch_size(self):
+        objs = [Event(pk=i, points=i) for i in range(1, 6)]
+        updated, statements = self.bulk_update(objs, ['points'], batch_size=2)
+        self.assertEqual(updated, 5)
+        self.assertEqual([params for sql, params in statements],
+                         [[1, 1, 2, 2], [3, 3, 4, 4], [5, 5]])
+
+    def test_unsaved(self):
+        with self.assertRaises(ValueError):
+            self.bulk_update([Event(points=1)], ['points'])
+        with self.assertRaises(ValueError):
+            self.bulk_update([Event(pk=1)], ['id'])
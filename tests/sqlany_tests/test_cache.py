@@ -0,0 +1,47 @@
+from django.test import SimpleTestCase
+
+from sqlany_django.cache import QueryCache, read_tables, write_tables
+
+class ReadTablesTests(SimpleTestCase):
+    def test_select(self):
+        self.assertEqual(read_tables('SELECT "a"."x" FROM "a" INNER JOIN "dba"."B" ON 1 = 1'),
+                         set(['a', 'b']))
+        self.assertIsNone(read_tables('SELECT * FROM a, b'))
+        self.assertIsNone(read_tables('UPDATE a SET x = 1'))
+
+    def test_locking(self):
+        for sql in ('SELECT "a"."x" FROM "a" WHERE "a"."id" = %s FOR UPDATE',
+                    'select x from a for  update',
+                    'SELECT "a"."x" FROM "a" WITH (READPAST) FOR UPDATE',
+                    'SELECT x FROM a WITH (UPDLOCK)',
+                    'SELECT x FROM a WITH (NOLOCK, XLOCK)'):
+            self.assertIsNone(read_tables(sql), sql)
+
+    def test_key(self):
+        cache = QueryCache(['a'])
+        self.assertIsNotNone(cache.key('SELECT x FROM a WHERE id = %s', [1]))
+        self.assertIsNone(cache.key('SELECT x FROM a WHERE id = %s FOR UPDATE', [1]))
+        self.assertIsNone(cache.key('SELECT x FROM a JOIN b ON 1 = 1', []))
+
+class WriteTablesTests(SimpleTestCase):
+    def test_writes(self):
+        self.assertEqual(write_tables('INSERT INTO "a" ("x") VALUES (%s)'), set(['a']))
+        self.assertEqual(write_tables('UPDATE "dba"."A" SET "x" = %s'), set(['a']))
+        self.assertEqual(write_tables('DELETE FROM a WHERE id IN (SELECT id FROM b)'), set(['a']))
+        self.assertIn('a', write_tables('MERGE INTO "a" USING (SELECT 1) AS s ON 1 = 1 '
+                                        'WHEN MATCHED THEN UPDATE SET x = 1'))
+        self.assertEqual(write_tables('CREATE INDEX "a_x" ON "a" ("x")'), set(['a']))
+        self.assertEqual(write_tables('REFRESH TEXT INDEX "a_text" ON "a"'), set(['a']))
+        self.assertIsNone(write_tables('SELECT x FROM a'))
+
+    def test_load_table(self):
+        self.assertEqual(write_tables("LOAD TABLE \"a\" FROM 'a.csv'"), set(['a']))
+        self.assertEqual(write_tables("LOAD INTO TABLE dba.a FROM 'a.csv'"), set(['a']))
+
+    def test_invalidate(self):
+        cache = QueryCache(['a'])
+        key = cache.key('SELECT x FROM a', [])
+        cache.set(key, (), ((1,),))
+        self.assertEqual(cache.get(key), ((), ((1,),)))
+        cache.invalidate(write_tables("LOAD TABLE a FROM 'a.csv'"))
+        self.assertNotEqual(cache.key('SELECT x FROM a', []), key)
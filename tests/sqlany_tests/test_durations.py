@@ -0,0 +1,66 @@
+import datetime
+
+from django.db import connection
+from django.db.models import DateField, DurationField, ExpressionWrapper, F
+from django.test import SimpleTestCase, TestCase
+
+from .models import Event
+
+def compiled(queryset):
+    return queryset.query.get_compiler(connection=connection).as_sql()
+
+def duration(expression):
+    return ExpressionWrapper(expression, output_field=DurationField())
+
+class DurationSQLTests(SimpleTestCase):
+    def test_params_match_placeholders(self):
+        start = datetime.datetime(2015, 6, 30, 23, 59, 59, 900000)
+        for queryset in (Event.objects.filter(ended__gt=F('started') + datetime.timedelta(seconds=1)),
+                         Event.objects.filter(started__lt=start - duration(F('ended') - F('started'))),
+                         Event.objects.annotate(d=duration(F('ended') - F('started')))):
+            sql, params = compiled(queryset)
+            self.assertEqual(sql.count('%s'), len(params))
+
+    def test_date_result_is_date(self):
+        sql, params = compiled(Event.objects.annotate(
+            next=ExpressionWrapper(F('day') + datetime.timedelta(days=1), output_field=DateField())))
+        self.assertIn('CAST(DATEADD(', sql)
+        self.assertIn('AS DATE)', sql)
+
+class DurationTests(TestCase):
+    def assertBetween(self, started, ended):
+        event = Event.objects.create(name='e', started=started, ended=ended)
+        found = Event.objects.annotate(d=duration(F('ended') - F('started'))).get(pk=event.pk).d
+        self.assertEqual(found, ended - started)
+
+    def test_fraction_straddling_second(self):
+        self.assertBetween(datetime.datetime(2015, 6, 30, 12, 0, 0, 900000),
+                           datetime.datetime(2015, 6, 30, 12, 0, 1, 100000))
+
+    def test_negative_fraction(self):
+        self.assertBetween(datetime.datetime(2015, 6, 30, 12, 0, 1, 100000),
+                           datetime.datetime(2015, 6, 30, 12, 0, 0, 900000))
+
+    def test_across_midnight(self):
+        self.assertBetween(datetime.datetime(2015, 6, 30, 23, 59, 59, 999999),
+                           datetime.datetime(2015, 7, 1, 0, 0, 0, 1))
+
+    def test_days(self):
+        self.assertBetween(datetime.datetime(2015, 1, 1, 8, 30, 15, 250000),
+                           datetime.datetime(2015, 12, 31, 7, 10, 5, 500000))
+
+    def test_add_fraction(self):
+        started = datetime.datetime(2015, 6, 30, 23, 59, 59, 900000)
+        event = Event.objects.create(name='e', started=started)
+        Event.objects.filter(pk=event.pk).update(
+            ended=F('started') + datetime.timedelta(microseconds=200000))
+        self.assertEqual(Event.objects.get(pk=event.pk).ended,
+                         started + datetime.timedelta(microseconds=200000))
+
+    def test_add_to_date(self):
+        event = Event.objects.create(name='e', started=datetime.datetime(2015, 6, 30),
+                                     day=datetime.date(2015, 6, 30))
+        found = Event.objects.annotate(
+            next=ExpressionWrapper(F('day') + datetime.timedelta(days=1), output_field=DateField())
+        ).get(pk=event.pk).next
+        self.assertEqual(found, datetime.date(2015, 7, 1))
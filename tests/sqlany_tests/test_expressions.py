@@ -0,0 +1,112 @@
+from django.db import connection
+from django.db.models import Avg, F, Sum
+from django.test import SimpleTestCase
+
+from sqlany_django.expressions import (
+    CumeDist, DenseRank, FirstValue, LastValue, PercentRank, Rank, RowNumber,
+    RowRange, ValueRange, Window,
+)
+
+from .models import Event
+
+def compiled(queryset):
+    return queryset.query.get_compiler(connection=connection).as_sql()
+
+class WindowTests(SimpleTestCase):
+    def assertWindow(self, window, expected):
+        sql, params = compiled(Event.objects.annotate(w=window).values('w'))
+        self.assertIn('%s AS "w"' % expected, sql)
+        return params
+
+    def test_row_number(self):
+        self.assertWindow(Window(RowNumber()), 'ROW_NUMBER() OVER ()')
+
+    def test_row_number_ordered(self):
+        self.assertWindow(Window(RowNumber(), order_by=['started']),
+                          'ROW_NUMBER() OVER (ORDER BY "sqlany_tests_event"."started" ASC)')
+
+    def test_rank(self):
+        self.assertWindow(Window(Rank(), order_by=['-points']),
+                          'RANK() OVER (ORDER BY "sqlany_tests_event"."points" DESC)')
+
+    def test_rank_partitioned(self):
+        self.assertWindow(
+            Window(Rank(), partition_by=['name', 'day'], order_by=['-points', 'started']),
+            'RANK() OVER (PARTITION BY "sqlany_tests_event"."name", "sqlany_tests_event"."day" '
+            'ORDER BY "sqlany_tests_event"."points" DESC, "sqlany_tests_event"."started" ASC)')
+
+    def test_partition_only(self):
+        self.assertWindow(Window(Sum('points'), partition_by=['name']),
+                          'SUM("sqlany_tests_event"."points") OVER '
+                          '(PARTITION BY "sqlany_tests_event"."name")')
+
+    def test_expressions(self):
+        self.assertWindow(Window(Avg('points'), partition_by=[F('name')],
+                                 order_by=[F('started').desc()]),
+                          'AVG("sqlany_tests_event"."points") OVER '
+                          '(PARTITION BY "sqlany_tests_event"."name" '
+                          'ORDER BY "sqlany_tests_event"."started" DESC)')
+
+    def test_ranking_functions(self):
+        for function, name in ((DenseRank(), 'DENSE_RANK'), (PercentRank(), 'PERCENT_RANK'),
+                               (CumeDist(), 'CUME_DIST')):
+            self.assertWindow(Window(function, order_by=['points']),
+                              '%s() OVER (ORDER BY "sqlany_tests_event"."points" ASC)' % name)
+
+    def test_value_functions(self):
+        self.assertWindow(Window(FirstValue('name'), order_by=['points']),
+                          'FIRST_VALUE("sqlany_tests_event"."name") OVER '
+                          '(ORDER BY "sqlany_tests_event"."points" ASC)')
+        self.assertWindow(Window(LastValue('name'), order_by=['points'],
+                                 frame=RowRange(None, None)),
+                          'LAST_VALUE("sqlany_tests_event"."name") OVER '
+                          '(ORDER BY "sqlany_tests_event"."points" ASC '
+                          'ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING)')
+
+    def test_row_frame(self):
+        self.assertWindow(Window(Sum('points'), partition_by=['name'], order_by=['started'],
+                                 frame=RowRange(end=0)),
+                          'SUM("sqlany_tests_event"."points") OVER '
+                          '(PARTITION BY "sqlany_tests_event"."name" '
+                          'ORDER BY "sqlany_tests_event"."started" ASC '
+                          'ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW)')
+
+    def test_range_frame(self):
+        self.assertWindow(Window(Sum('points'), order_by=['points'],
+                                 frame=ValueRange(-10, 5)),
+                          'SUM("sqlany_tests_event"."points") OVER '
+                          '(ORDER BY "sqlany_tests_event"."points" ASC '
+                          'RANGE BETWEEN 10 PRECEDING AND 5 FOLLOWING)')
+
+    def test_no_params(self):
+        params = self.assertWindow(Window(RowNumber(), order_by=['points']),
+                                   'ROW_NUMBER() OVER (ORDER BY "sqlany_tests_event"."points" ASC)')
+        self.assertEqual(list(params), [])
+
+    def test_not_grouped(self):
+        sql, params = compiled(Event.objects.annotate(total=Window(Sum('points'))))
+        self.assertNotIn('GROUP BY', sql)
+
+class WindowFrameTests(SimpleTestCase):
+    def test_rows_start_end(self):
+        ops = connection.ops
+        self.assertEqual(ops.window_frame_rows_start_end(),
+                         ('UNBOUNDED PRECEDING', 'UNBOUNDED FOLLOWING'))
+        self.assertEqual(ops.window_frame_rows_start_end(0, 0), ('CURRENT ROW', 'CURRENT ROW'))
+        self.assertEqual(ops.window_frame_rows_start_end(-3, 2), ('3 PRECEDING', '2 FOLLOWING'))
+
+    def test_range_start_end(self):
+        self.assertEqual(connection.ops.window_frame_range_start_end(-1, None),
+                         ('1 PRECEDING', 'UNBOUNDED FOLLOWING'))
+
+    def test_invalid_points(self):
+        ops = connection.ops
+        self.assertRaises(ValueError, ops.window_frame_start, 1)
+        self.assertRaises(ValueError, ops.window_frame_end, -1)
+        self.assertRaises(ValueError, ops.window_frame_rows_start_end, 2, None)
+
+    def test_frame_sql(self):
+        self.assertEqual(RowRange(-2, 0).as_sql(connection),
+                         'ROWS BETWEEN 2 PRECEDING AND CURRENT ROW')
+        self.assertEqual(ValueRange(start=0).as_sql(connection),
+                         'RANGE BETWEEN CURRENT ROW AND UNBOUNDED FOLLOWING')
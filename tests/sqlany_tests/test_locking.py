@@ -0,0 +1,91 @@
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from django.db import connection
+from django.db.models.sql import compiler
+from django.db.models.sql.constants import MULTI
+from django.test import SimpleTestCase
+
+from sqlany_django.base import CursorWrapper
+from sqlany_django.transaction import LockingQuerySet
+
+from .models import Event, Registration
+
+class RecordingCursor(object):
+    description = None
+    arraysize = 1
+
+    def __init__(self, statements):
+        self.statements = statements
+
+    def execute(self, sql, params=()):
+        self.statements.append(sql)
+
+    def fetchone(self):
+        return ('On',)
+
+    def close(self):
+        pass
+
+class ReadPastTests(SimpleTestCase):
+    def compiled(self, queryset):
+        with mock.patch.object(connection, 'get_autocommit', return_value=False):
+            return queryset.query.get_compiler(connection=connection).as_sql()
+
+    def test_hint_on_base_table(self):
+        queryset = LockingQuerySet(Registration).select_for_update(skip_locked=True)
+        sql, params = self.compiled(queryset.filter(event__name='x'))
+        table = connection.ops.quote_name(Registration._meta.db_table)
+        self.assertIn('FROM %s WITH (READPAST) INNER JOIN' % table, sql)
+        self.assertTrue(sql.endswith('FOR UPDATE'))
+
+    def test_clone_keeps_skip_locked(self):
+        queryset = LockingQuerySet(Event).select_for_update(skip_locked=True)
+        sql, params = self.compiled(queryset.filter(points=1).order_by('name'))
+        self.assertIn('WITH (READPAST)', sql)
+
+    def test_only_when_skipping(self):
+        for queryset in (LockingQuerySet(Event).select_for_update(),
+                         LockingQuerySet(Event).filter(points=1)):
+            self.assertNotIn('READPAST', self.compiled(queryset)[0])
+
+    def test_nowait_and_skip_locked(self):
+        with self.assertRaises(ValueError):
+            LockingQuerySet(Event).select_for_update(nowait=True, skip_locked=True)
+
+class NowaitBlockingTests(SimpleTestCase):
+    def setUp(self):
+        self.statements = []
+        patcher = mock.patch.object(connection, 'create_cursor',
+                                    lambda: RecordingCursor(self.statements))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(setattr, connection, 'blocking', None)
+        self.addCleanup(setattr, connection, 'blocking_restore', None)
+
+    def execute_nowait(self):
+        queryset = Event.objects.select_for_update(nowait=True)
+        with mock.patch.object(compiler.SQLCompiler, 'execute_sql', return_value=iter([[(1,)]])):
+            return queryset.query.get_compiler(connection=connection).execute_sql(MULTI)
+
+    def test_restored_before_next_statement(self):
+        self.assertEqual(self.execute_nowait(), [[(1,)]])
+        self.assertEqual(self.statements, ["SELECT CONNECTION_PROPERTY('blocking')",
+                                           "SET TEMPORARY OPTION blocking='Off'"])
+        self.assertIs(connection.blocking_restore, True)
+        # A second NOWAIT select finds blocking still off
+        self.execute_nowait()
+        self.assertEqual(len(self.statements), 2)
+        CursorWrapper(RecordingCursor(self.statements), connection).execute('SELECT 1')
+        self.assertEqual(self.statements[2:], ["SET TEMPORARY OPTION blocking='On'", 'SELECT 1'])
+        self.assertIsNone(connection.blocking_restore)
+        self.assertIs(connection.blocking, True)
+
+    def test_blocking_already_off(self):
+        connection.blocking = False
+        self.execute_nowait()
+        self.assertEqual(self.statements, [])
+        CursorWrapper(RecordingCursor(self.statements), connection).execute('SELECT 1')
+        self.assertEqual(self.statements, ['SELECT 1'])
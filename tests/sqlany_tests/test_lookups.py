@@ -0,0 +1,87 @@
+import re
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from sqlany_django.lookups import regex_plan, split_list_plan
+
+from .models import Event
+
+def compiled(queryset):
+    return queryset.query.get_compiler(connection=connection).as_sql()
+
+class RegexPlanTests(SimpleTestCase):
+    def test_literal(self):
+        self.assertEqual(regex_plan('Foo'),
+                         ("(%(lhs)s LIKE %%s ESCAPE '\\' AND %(lhs)s REGEXP %%s)",
+                          ['%Foo%', '.*Foo.*']))
+
+    def test_anchored_literal(self):
+        self.assertEqual(regex_plan('^Foo$'),
+                         ("(%(lhs)s = %%s AND %(lhs)s REGEXP %%s)", ['Foo', 'Foo']))
+        self.assertEqual(regex_plan('^Foo'),
+                         ("(%(lhs)s LIKE %%s ESCAPE '\\' AND %(lhs)s REGEXP %%s)",
+                          ['Foo%', 'Foo.*']))
+
+    def test_prefix(self):
+        self.assertEqual(regex_plan('^a_b\\.c+d'),
+                         ("(%(lhs)s LIKE %%s ESCAPE '\\' AND %(lhs)s REGEXP %%s)",
+                          ['a\\_b.%', 'a_b\\.c+d.*']))
+
+    def test_unanchored(self):
+        self.assertEqual(regex_plan('a+b'), ("%(lhs)s REGEXP %%s", ['.*a+b.*']))
+        self.assertIsNone(regex_plan('^a|b'))
+
+    def test_every_plan_keeps_regexp(self):
+        for pattern in ('Foo', '^Foo', 'Foo$', '^Foo$', '^Fo+', 'F.o'):
+            sql, params = compiled(Event.objects.filter(name__regex=pattern))
+            self.assertIn('REGEXP', sql, pattern)
+
+class SplitListPlanTests(SimpleTestCase):
+    def test_integers(self):
+        self.assertEqual(split_list_plan([3, 1, 2]),
+                         ("SELECT CAST(row_value AS BIGINT) FROM sa_split_list(%s, ',')", ['3,1,2']))
+        self.assertIsNone(split_list_plan([1, True]))
+        self.assertIsNone(split_list_plan([1, 'a']))
+
+    def test_strings(self):
+        self.assertEqual(split_list_plan(['a', 'b']),
+                         ("SELECT row_value FROM sa_split_list(%s, %s)", ['a,b', ',']))
+
+    def test_delimiter_switch(self):
+        self.assertEqual(split_list_plan(['a,b', 'c']),
+                         ("SELECT row_value FROM sa_split_list(%s, %s)", ['a,b\x1fc', '\x1f']))
+        self.assertEqual(split_list_plan(['a,b', 'c\x1f']),
+                         ("SELECT row_value FROM sa_split_list(%s, %s)", ['a,b\x1ec\x1f', '\x1e']))
+        self.assertIsNone(split_list_plan([',', '\x1f', '\x1e', '\x1d']))
+
+    def test_large_in(self):
+        size = connection.ops.large_in_list_size
+        sql, params = compiled(Event.objects.filter(points__in=range(size + 1)))
+        self.assertIn('IN (SELECT CAST(row_value AS BIGINT) FROM sa_split_list(%s, \',\'))', sql)
+        self.assertEqual(params, (','.join(str(i) for i in range(size + 1)),))
+        sql, params = compiled(Event.objects.filter(points__in=range(size)))
+        self.assertNotIn('sa_split_list', sql)
+        self.assertEqual(len(params), size)
+
+class RegexLookupTests(TestCase):
+    names = ['Foo', 'foo', 'FOO', 'xFoox', 'xfoox', 'Foobar', 'barfoo', 'F.o']
+
+    @classmethod
+    def setUpTestData(cls):
+        for name in cls.names:
+            Event.objects.create(name=name, started='2015-06-30 12:00:00')
+
+    def assertMatchesRe(self, pattern):
+        expected = sorted(name for name in self.names if re.search(pattern, name))
+        found = sorted(Event.objects.filter(name__regex=pattern).values_list('name', flat=True))
+        self.assertEqual(found, expected, pattern)
+
+    def test_case_sensitive(self):
+        # = and LIKE ignore case under the default collation, REGEXP doesn't
+        for pattern in ('Foo', 'foo', '^Foo$', '^foo$', '^Foo', 'bar$', 'Foo$', '^F\\.o$'):
+            self.assertMatchesRe(pattern)
+
+    def test_metacharacters(self):
+        for pattern in ('^Fo+', 'F.o', 'o+b', 'x[fF]oo'):
+            self.assertMatchesRe(pattern)
@@ -0,0 +1,33 @@
+from django.db import connection
+from django.test import SimpleTestCase
+
+from sqlany_django.search import SearchScore, TextIndex, text_indexes
+
+from .models import Event
+
+def compiled(queryset):
+    return queryset.query.get_compiler(connection=connection).as_sql()
+
+class SearchScoreTests(SimpleTestCase):
+    def test_single_contains_join(self):
+        sql, params = compiled(Event.objects.annotate(rank=SearchScore('name', 'shoe')))
+        self.assertEqual(sql.count('CONTAINS'), 1)
+        self.assertIn('LEFT OUTER JOIN (SELECT "id", "sa_contains"."score" FROM '
+                      '"sqlany_tests_event" CONTAINS ("name", %s) AS "sa_contains") AS "sa_score" '
+                      'ON ("sqlany_tests_event"."id" = "sa_score"."id")', sql)
+        self.assertIn('"sa_score"."score" AS "rank"', sql)
+        self.assertEqual(list(params), ['shoe'])
+
+    def test_subquery(self):
+        inner = Event.objects.annotate(rank=SearchScore('name', 'shoe')).filter(rank__gt=0.5)
+        sql, params = compiled(Event.objects.filter(pk__in=inner.values('pk')))
+        self.assertIn('AS U1 ON (U0."id" = U1."id")', sql)
+        self.assertIn('U1."score" > %s', sql)
+        self.assertEqual(list(params), ['shoe', 0.5])
+
+class TextIndexTests(SimpleTestCase):
+    def test_declared_on_model(self):
+        class Indexed(object):
+            text_indexes = [TextIndex(['name'])]
+        self.assertEqual(text_indexes(Indexed), [TextIndex(['name'])])
+        self.assertEqual(text_indexes(Event), [])
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+from django.test import TestCase
+
+from sqlany_django.streaming import open_value
+
+from .models import Attachment
+
+class OpenValueTests(TestCase):
+    def setUp(self):
+        self.attachment = Attachment.objects.create(text=u'old', data=b'old')
+
+    def test_text_round_trip(self):
+        # Chunks of 5 bytes split the two byte characters
+        value = u'h\xe9llo w\xf6rld ' * 50
+        with open_value(self.attachment, 'text', 'w', chunk_size=5) as f:
+            for i in range(0, len(value), 7):
+                f.write(value[i:i + 7])
+        self.assertEqual(Attachment.objects.get(pk=self.attachment.pk).text, value)
+        with open_value(self.attachment, 'text', chunk_size=5) as f:
+            self.assertEqual(u''.join(f), value)
+
+    def test_binary_round_trip(self):
+        value = bytes(bytearray(range(256))) * 10
+        with open_value(self.attachment, 'data', 'w', chunk_size=100) as f:
+            f.write(value[:1000])
+            f.write(value[1000:])
+        with open_value(self.attachment, 'data', chunk_size=100) as f:
+            self.assertEqual(f.read(), value)
+            f.seek(250)
+            self.assertEqual(f.read(10), value[250:260])
+
+    def test_empty(self):
+        with open_value(self.attachment, 'data', 'w'):
+            pass
+        with open_value(self.attachment, 'data') as f:
+            self.assertEqual(f.read(), b'')
+
+    def test_raise_leaves_value(self):
+        with self.assertRaises(ZeroDivisionError):
+            with open_value(self.attachment, 'text', 'w', chunk_size=1) as f:
+                f.write(u'new')
+                1 / 0
+        self.assertEqual(Attachment.objects.get(pk=self.attachment.pk).text, u'old')
+
+    def test_missing_row(self):
+        Attachment.objects.filter(pk=self.attachment.pk).delete()
+        with self.assertRaises(Attachment.DoesNotExist):
+            open_value(self.attachment, 'text', 'w')
@@ -0,0 +1,107 @@
+import contextlib
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from django.db import connection
+from django.db.transaction import Atomic, TransactionManagementError
+from django.test import SimpleTestCase
+
+from sqlany_django import transaction
+from sqlany_django.base import DeadlockError, LockTimeoutError
+
+@contextlib.contextmanager
+def no_transaction(*args):
+    yield
+
+class RetryAtomicTests(SimpleTestCase):
+    def setUp(self):
+        # Run without a database or waiting between attempts
+        for patcher in (mock.patch.object(transaction, 'IsolatedAtomic', no_transaction),
+                        mock.patch.object(transaction.time, 'sleep')):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.retries = []
+        transaction.transaction_retried.connect(self.retried)
+        self.addCleanup(transaction.transaction_retried.disconnect, self.retried)
+        self.stats = dict(transaction.retry_stats)
+
+    def retried(self, sender, **kwargs):
+        self.retries.append(kwargs)
+
+    def counted(self, key):
+        return transaction.retry_stats[key] - self.stats[key]
+
+    def failing(self, *errors):
+        errors = list(errors)
+        def func(value):
+            if errors:
+                raise errors.pop(0)
+            return value
+        return func
+
+    def test_retry_succeeds(self):
+        func = self.failing(DeadlockError('Deadlock detected', -306),
+                            LockTimeoutError('User has the row locked', -210))
+        result = transaction.retry_atomic(attempts=3, backoff=0.1, max_backoff=0.15).run(func, 'done')
+        self.assertEqual(result, 'done')
+        self.assertEqual([r['attempt'] for r in self.retries], [1, 2])
+        self.assertEqual([r['using'] for r in self.retries], [connection.alias] * 2)
+        # Up to backoff * 2**attempt, capped at max_backoff
+        self.assertTrue(0 <= self.retries[0]['delay'] <= 0.15)
+        self.assertTrue(0 <= self.retries[1]['delay'] <= 0.15)
+        self.assertEqual((self.counted('retried'), self.counted('deadlocks'),
+                          self.counted('lock_timeouts'), self.counted('exhausted')), (2, 1, 1, 0))
+
+    def test_gives_up_after_attempts(self):
+        errors = [DeadlockError('Deadlock detected', -306) for i in range(3)]
+        func = self.failing(*errors)
+        with self.assertRaises(DeadlockError) as cm:
+            transaction.retry_atomic(attempts=3)(func)('done')
+        self.assertIs(cm.exception, errors[-1])
+        self.assertEqual(len(self.retries), 2)
+        self.assertEqual((self.counted('retried'), self.counted('deadlocks'),
+                          self.counted('exhausted')), (2, 3, 1))
+
+    def test_other_errors_not_retried(self):
+        func = self.failing(ValueError('no'))
+        with self.assertRaises(ValueError):
+            transaction.retry_atomic().run(func, 'done')
+        self.assertEqual(self.retries, [])
+
+class LevelCursor(object):
+    def __init__(self, statements, level):
+        self.statements = statements
+        self.level = level
+
+    def execute(self, sql):
+        self.statements.append(sql)
+
+    def fetchone(self):
+        return (self.level,)
+
+    def close(self):
+        pass
+
+class NestedIsolationLevelTests(SimpleTestCase):
+    def setUp(self):
+        self.statements = []
+        # Inside a transaction whose level hasn't been read yet
+        for patcher in (mock.patch.object(connection, 'in_atomic_block', True),
+                        mock.patch.object(connection, 'isolation_level', None),
+                        mock.patch.object(connection, 'create_cursor',
+                                          lambda: LevelCursor(self.statements, '1')),
+                        mock.patch.object(Atomic, '__enter__')):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_same_level(self):
+        transaction.atomic(isolation_level='read committed').__enter__()
+        self.assertEqual(self.statements, ["SELECT CONNECTION_PROPERTY('isolation_level')"])
+        self.assertEqual(connection.isolation_level, '1')
+
+    def test_other_level(self):
+        with self.assertRaises(TransactionManagementError):
+            transaction.atomic(isolation_level='snapshot').__enter__()